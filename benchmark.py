@@ -0,0 +1,79 @@
+import random
+import sys
+import time
+
+import evaluator
+from holdem import Poker
+
+""" Hand Evaluation Benchmark.
+
+This module times each hand evaluator over the same random seven card hands
+and prints how many hands per second each one scores.
+
+Usage:
+    python benchmark.py [number of hands]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+
+def make_hands(number_of_hands, seed=0):
+    """
+    Deals random sorted seven card hands.
+
+    :param number_of_hands: how many hands to deal
+    :param seed: the seed of the random number generator
+    :return: a list of hands, which are lists of card codes
+    """
+    rng = random.Random(seed)
+    return [sorted(rng.sample(range(52), 7)) for i in range(number_of_hands)]
+
+
+def time_evaluator(name, function, hands):
+    """
+    Times a hand evaluator and prints its hands per second.
+
+    :param name: the name to print for the evaluator
+    :param function: the evaluator, called once per hand
+    :param hands: the hands to evaluate
+    :return: the number of hands scored per second
+    """
+    start = time.perf_counter()
+    for hand in hands:
+        function(hand)
+    elapsed = time.perf_counter() - start
+    rate = len(hands) / elapsed
+    print("{:<24}{:>14,.0f} hands/s".format(name, rate))
+    return rate
+
+
+if __name__ == "__main__":
+    number_of_hands = 200000
+    if len(sys.argv) == 2:
+        number_of_hands = int(sys.argv[1])
+
+    hands = make_hands(number_of_hands)
+
+    # Table building is a one time cost, so it is kept out of the timings
+    start = time.perf_counter()
+    evaluator.build_tables()
+    print("Built evaluator tables in {:.2f}s".format(
+        time.perf_counter() - start))
+
+    legacy = time_evaluator("Poker.legacy_score", Poker.legacy_score, hands)
+    table = time_evaluator("evaluator.score", evaluator.score, hands)
+    time_evaluator("evaluator.evaluate", evaluator.evaluate, hands)
+    print("Table evaluator speed up: {:.1f}x".format(table / legacy))
+
+    if evaluator.numpy is not None:
+        evaluator.build_batch_tables()
+        hands_array = evaluator.numpy.array(hands)
+        start = time.perf_counter()
+        Poker.score_batch(hands_array)
+        elapsed = time.perf_counter() - start
+        print("{:<24}{:>14,.0f} hands/s".format("Poker.score_batch",
+                                                len(hands) / elapsed))
@@ -0,0 +1,178 @@
+""" Betting Round State Machine.
+This module holds the state of one betting phase of a hand.
+
+A BettingRound never waits on anyone. It is told each action as it comes in,
+and answers with who acts next, so whoever holds it can ask for the action
+however it likes, and can put the round aside between actions:
+
+    betting = BettingRound(bids, statuses, first_player)
+    while not betting.done:
+        action, amount = ask(betting.player, betting.actions)
+        betting.act(action, amount)
+
+Players act in turn until every player still in has acted since the last
+raise and matched the highest bid, or all but one have folded.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+ACTIONS = ("fold", "hold", "call", "raise")
+
+
+class BettingRound:
+    """
+    Class holding the bids and turn order of a betting phase
+    """
+
+    def __init__(self, bids, statuses, first_player, max_raises=None,
+                 highest_bid=None):
+        """
+        Constructor for the BettingRound class.
+
+        :param bids: each player's bid, updated in place
+        :param statuses: each player's last action, updated in place
+        :param first_player: the id of the player to act first, or the
+                             next player still in after them
+        :param max_raises: how many raises the phase allows, or None for
+                           no limit
+        :param highest_bid: the highest bid going into the phase, the
+                            highest of the bids by default
+        """
+        self.bids = bids
+        self.statuses = statuses
+        self.max_raises = max_raises
+        self.prev_round_highest = max(bids) if highest_bid is None \
+            else highest_bid
+        self.highest_bid = self.prev_round_highest
+        self.raises = 0
+        # The players still to act before the phase can end
+        self.waiting = {player for player in range(len(bids))
+                        if statuses[player] != "fold"}
+        self.player = None
+        self.advance((first_player - 1) % len(bids))
+
+    @property
+    def done(self):
+        """
+        Checks whether the phase is over.
+
+        :return: True if no one is left to act; False if otherwise
+        """
+        return self.player is None
+
+    @property
+    def to_call(self):
+        """
+        Gets how much the player to act must add to match the highest bid.
+
+        :return: the amount to call
+        """
+        return self.highest_bid - self.bids[self.player]
+
+    @property
+    def raises_left(self):
+        """
+        Gets how many more raises the phase allows.
+
+        :return: the number of raises left, or None for no limit
+        """
+        if self.max_raises is None:
+            return None
+        return self.max_raises - self.raises
+
+    @property
+    def actions(self):
+        """
+        Gets the actions the player to act may take.
+
+        :return: a list of the legal actions
+        """
+        actions = ["fold", "call" if self.to_call else "hold"]
+        if self.raises_left is None or self.raises_left > 0:
+            actions.append("raise")
+        return actions
+
+    @property
+    def pot(self):
+        """
+        Gets the chips bid so far.
+
+        :return: the sum of every player's bid
+        """
+        return sum(self.bids)
+
+    def active(self):
+        """
+        Gets the players who haven't folded.
+
+        :return: a list of their ids
+        """
+        return [player for player in range(len(self.statuses))
+                if self.statuses[player] != "fold"]
+
+    def legal_action(self, action, amount=0):
+        """
+        Reads an action, turning it into the nearest legal one. Holding or
+        calling is whichever matches the bids, and a raise past the limit,
+        or by nothing, is a call.
+
+        :param action: the action, such as "raise"
+        :param amount: the amount to raise by
+        :return: the action and the amount raised by
+        """
+        action = str(action).strip().lower()
+        if action not in ACTIONS:
+            raise ValueError("Unknown action " + repr(action) + ".")
+        if action == "raise":
+            amount = int(amount)
+            if amount > 0 and "raise" in self.actions:
+                return action, amount
+        if action == "fold":
+            return action, 0
+        return ("call" if self.to_call else "hold"), 0
+
+    def act(self, action, amount=0):
+        """
+        Takes the action of the player to act.
+
+        :param action: the action, such as "raise"
+        :param amount: the amount to raise by
+        :return: the action and amount taken, once made legal
+        """
+        if self.done:
+            raise ValueError("The betting round is over.")
+        action, amount = self.legal_action(action, amount)
+        player = self.player
+
+        self.waiting.discard(player)
+        if action == "raise":
+            self.highest_bid += amount
+            self.raises += 1
+            # Everyone still in has to answer the raise
+            self.waiting = set(self.active())
+            self.waiting.discard(player)
+        if action != "fold":
+            self.bids[player] = self.highest_bid
+        self.statuses[player] = action
+        self.advance(player)
+        return action, amount
+
+    def advance(self, player):
+        """
+        Moves the turn on to the next player still to act after a player.
+
+        :param player: the id of the player who last acted
+        """
+        self.player = None
+        if len(self.active()) < 2:
+            return
+        number_of_players = len(self.bids)
+        for offset in range(1, number_of_players + 1):
+            next_player = (player + offset) % number_of_players
+            if next_player in self.waiting:
+                self.player = next_player
+                return
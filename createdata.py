@@ -1,11 +1,29 @@
+import argparse
+import os
 import random
+import shutil
 import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
+from deck import to_card
+from evaluator import HandState
 from holdem import Poker
+from shards import shard_seeds, split_counts
 
 """ Texas Hold Em AI Poker Bot Data Creator.
 
-This module plays games of Texas Hold Em to create data for AI training. 
+This module plays games of Texas Hold Em to create data for AI training.
+
+A run can be split into shards played across a pool of processes. Each shard
+writes its own file with a seed drawn from the master seed, and the files are
+then merged in order, so a run is reproducible for a given seed and number of
+workers.
+
+Usage:
+    python createdata.py [--hands N] [--players N] [--seed N]
+                         [--output FILE] [--workers N]
+                         [--evaluator legacy|table] [--quiet]
 
 Authors:
     Charles Billingsley
@@ -15,59 +33,72 @@ Authors:
 """
 
 debug = False  # Set to True to see the debug statements
-number_of_players = 2
-f = open("records.csv", "w+")  # Create file of history.
 
-for roundHand in range(0, 32000):
+# Seconds between progress reports
+progress_interval = 1.0
+
+
+def play_hand(poker, rng, verbose=True):
+    """
+    Plays one hand to its showdown and records the scores of each player.
+
+    :param poker: the game to play the hand with
+    :param rng: the random number generator to cut the deck with
+    :param verbose: whether or not to print the hand as it is played
+    :return: a list of each player's record, the scores of their hand at
+             every phase followed by a 1 for a win or a 0 for a loss
+    """
     # Will keep track of the scores of a hand throughout a game.
     hand_history = []
 
-    poker = Poker(number_of_players, debug)
-    if not poker:
-        sys.exit(
-            "*** ERROR ***: "
-            "Invalid number of players. It must be between 2 and 22."
-        )
-
-    print("1. Shuffling")
+    if verbose:
+        print("1. Shuffling")
     poker.shuffle()
 
-    print("2. Cutting")
-    if not poker.cut(random.randint(1, 51)):
+    if verbose:
+        print("2. Cutting")
+    if not poker.cut(rng.randint(1, 51)):
         # Cannot cut 0, or the number of cards in the deck
         sys.exit("*** ERROR ***: Invalid amount entered to cut the deck.")
 
-    print("3. Distributing")
+    if verbose:
+        print("3. Distributing")
     players_hands = poker.distribute()
     if not players_hands:
         sys.exit("*** ERROR ***: Insufficient cards to distribute.")
 
-    print("4. Hands")
-    print("-----------------------")
+    if verbose:
+        print("4. Hands")
+        print("-----------------------")
+    # Each player's hand is scored as the streets are added to it
+    hand_states = []
     for hand in players_hands:
-        text = "Player - "
-        for card in hand:
-            text += str(card) + "  "
-        print(text)
+        if verbose:
+            text = "Player - "
+            for card in hand:
+                text += str(to_card(card)) + "  "
+            print(text)
+        hand_states.append(HandState(hand))
         hand_history.append(
-            str(poker.score(hand)[0]) + ", ")  # Score of just hand.
-    print("-----------------------")
+            str(hand_states[-1].score()[0]) + ", ")  # Score of just hand.
+    if verbose:
+        print("-----------------------")
 
-    # Gets and prints the community cards
-    print("5. Community Cards")
-    print("-----------------------")
+        # Gets and prints the community cards
+        print("5. Community Cards")
+        print("-----------------------")
 
     # Gets the flop
     card = poker.get_flop()
     if not card:
         sys.exit("*** ERROR ***: Insufficient cards to distribute.")
     community_cards = card
+    board_state = HandState(card)
     i = 0
-    for hand in players_hands:
-        total = hand + community_cards
-        total.sort(key=lambda x: x.value)
+    for state in hand_states:
+        state.add_cards(card)
         # Score of hand + 3 community cards.
-        hand_history[i] += str(poker.score(total)[0]) + ", "
+        hand_history[i] += str(state.score()[0]) + ", "
         i += 1
 
     # Gets the Turn
@@ -75,12 +106,12 @@ for roundHand in range(0, 32000):
     if not card:
         sys.exit("*** ERROR ***: Insufficient cards to distribute.")
     community_cards.extend(card)
+    board_state.add_cards(card)
     i = 0
-    for hand in players_hands:
-        total = hand + community_cards
-        total.sort(key=lambda x: x.value)
+    for state in hand_states:
+        state.add_cards(card)
         # Score of hand + 4 community cards.
-        hand_history[i] += str(poker.score(total)[0]) + ", "
+        hand_history[i] += str(state.score()[0]) + ", "
         i += 1
 
     # Gets the River
@@ -88,32 +119,32 @@ for roundHand in range(0, 32000):
     if not card:
         sys.exit("*** ERROR ***: Insufficient cards to distribute.")
     community_cards.extend(card)
+    board_state.add_cards(card)
     i = 0
-    for hand in players_hands:
-        total = hand + community_cards
-        total.sort(key=lambda x: x.value)
+    for state in hand_states:
+        state.add_cards(card)
         hand_history[i] += str(
-            poker.score(total)[0]) + ", "  # Score of hand + 5 community cards.
-        temp = community_cards
-        temp.sort(key=lambda x: x.value)
+            state.score()[0]) + ", "  # Score of hand + 5 community cards.
         hand_history[i] += str(
-            poker.score(temp)[0])  # Score of all 5 community cards.
+            board_state.score()[0])  # Score of all 5 community cards.
         i += 1
 
-    # Displays the Cards
-    text = "Community Cards - "
-    for card in community_cards:
-        text += str(card) + "  "
-    print(text)
-    print("-----------------------")
+    if verbose:
+        # Displays the Cards
+        text = "Community Cards - "
+        for card in community_cards:
+            text += str(to_card(card)) + "  "
+        print(text)
+        print("-----------------------")
 
-    print("6. Determining Score")
+        print("6. Determining Score")
     try:
         results = poker.determine_score(community_cards, players_hands)
     except:
         sys.exit("*** ERROR ***: Problem determining the score.")
 
-    print("7. Determining Winner")
+    if verbose:
+        print("7. Determining Winner")
     try:
         winner = poker.determine_winner(results)
     except:
@@ -127,39 +158,163 @@ for roundHand in range(0, 32000):
     except:
         tie = False
 
-    if not tie:
-        counter = 0
-        print("-------- Winner has Been Determined --------")
-        for hand in players_hands:
-            if counter == winner:
-                text = "Winner ** "
-                hand_history[counter] += ", 1"  # Record win
-            else:
-                text = "Loser  -- "
-                hand_history[counter] += ", 0"  # Record loss
+    if verbose:
+        if not tie:
+            print("-------- Winner has Been Determined --------")
+        else:
+            print("--------- Tie has Been Determined --------")
+    counter = 0
+    for hand in players_hands:
+        if (not tie and counter == winner) or (tie and counter in winner):
+            text = "Winner ** "
+            hand_history[counter] += ", 1"  # Record win
+        else:
+            text = "Loser  -- "
+            hand_history[counter] += ", 0"  # Record loss
+        if verbose:
             for c in hand:
-                text += str(c) + "  "
+                text += str(to_card(c)) + "  "
 
             text += " --- " + poker.name_of_hand(results[counter][0])
-            counter += 1
             print(text)
+        counter += 1
+
+    return hand_history
+
+
+def report_progress(hands_done, hands, start):
+    """
+    Prints how far a run has got and how fast it is going.
+
+    :param hands_done: the number of hands played so far
+    :param hands: the number of hands in the run
+    :param start: the time.perf_counter() the run started at
+    """
+    elapsed = time.perf_counter() - start
+    rate = hands_done / elapsed if elapsed else 0.0
+    print("{:,}/{:,} hands, {:,.0f} hands/s".format(hands_done, hands, rate),
+          file=sys.stderr)
+
+
+def generate(hands, path, hand_seed=None, verbose=True, players=2,
+             evaluator="legacy", progress=True):
+    """
+    Plays hands in this process and writes their records to a file.
+
+    :param hands: the number of hands to play
+    :param path: the file to write the records to
+    :param hand_seed: the seed of the random number generator,
+                      or None for an unseeded run
+    :param verbose: whether or not to print every hand
+    :param players: the number of players at the table
+    :param evaluator: which of Poker.EVALUATORS scores the showdown
+    :param progress: whether or not to report progress as hands per second
+    """
+    rng = random.Random(hand_seed)
+    start = time.perf_counter()
+    last_report = start
+    with open(path, "w+") as f:  # Create file of history.
+        for roundHand in range(0, hands):
+            poker = Poker(players, debug, evaluator, rng=rng)
+            hand_history = play_hand(poker, rng, verbose)
+            for record in hand_history:
+                f.write(record + "\n")
+
+            if progress and time.perf_counter() - last_report \
+                    >= progress_interval:
+                last_report = time.perf_counter()
+                report_progress(roundHand + 1, hands, start)
+    if progress:
+        report_progress(hands, hands, start)
+
+
+def generate_parallel(hands, path, master_seed, shards, players=2,
+                      evaluator="legacy", progress=True):
+    """
+    Splits the hands into shards played across a pool of processes,
+    then merges the shard files in order into one file.
+
+    :param hands: the number of hands to play
+    :param path: the file to write the records to
+    :param master_seed: the seed each shard's seed is derived from
+    :param shards: the number of shards, and of processes
+    :param players: the number of players at the table
+    :param evaluator: which of Poker.EVALUATORS scores the showdown
+    :param progress: whether or not to report progress as shards finish
+    """
+    counts = split_counts(hands, shards)
+    paths = [path + ".shard" + str(i) for i in range(shards)]
+    seeds = shard_seeds(master_seed, shards)
+
+    start = time.perf_counter()
+    hands_done = 0
+    with ProcessPoolExecutor(shards) as pool:
+        futures = {pool.submit(generate, counts[i], paths[i], seeds[i],
+                               False, players, evaluator, False): i
+                   for i in range(shards)}
+        for future in as_completed(futures):
+            future.result()
+            hands_done += counts[futures[future]]
+            if progress:
+                report_progress(hands_done, hands, start)
+
+    with open(path, "wb") as f:
+        for shard_path in paths:
+            with open(shard_path, "rb") as shard:
+                shutil.copyfileobj(shard, f)
+            os.remove(shard_path)
+
+
+def parse_arguments(arguments):
+    """
+    Reads the command line options of a run.
+
+    :param arguments: the command line arguments, without the program name
+    :return: the parsed options
+    """
+    parser = argparse.ArgumentParser(
+        description="Plays hands of Texas Hold Em to create AI training data.")
+    parser.add_argument("--hands", type=int, default=32000,
+                        help="number of hands to play (default 32000)")
+    parser.add_argument("--players", type=int, default=2,
+                        help="number of players, 2 to 10 (default 2)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed making the run reproducible")
+    parser.add_argument("--output", default="records.csv",
+                        help="file to write the records to "
+                             "(default records.csv)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes to split the run across (default 1)")
+    parser.add_argument("--evaluator", choices=Poker.EVALUATORS,
+                        default="legacy",
+                        help="hand evaluator used at the showdown")
+    parser.add_argument("--quiet", action="store_true",
+                        help="don't print every hand, only the progress")
+    options = parser.parse_args(arguments)
+
+    if options.players < 2 or options.players > 10:
+        parser.error("the number of players must be between 2 and 10")
+    if options.hands < 1:
+        parser.error("the number of hands must be at least 1")
+    if options.workers < 1:
+        parser.error("the number of workers must be at least 1")
+    return options
+
+
+def main(arguments):
+    """
+    Runs the data creator from the command line.
+
+    :param arguments: the command line arguments, without the program name
+    """
+    options = parse_arguments(arguments)
+    if options.workers > 1:
+        generate_parallel(options.hands, options.output, options.seed,
+                          options.workers, options.players, options.evaluator)
     else:
-        counter = 0
-        print("--------- Tie has Been Determined --------")
-        for hand in players_hands:
-            if counter in winner:
-                text = "Winner ** "
-                hand_history[counter] += ", 1"  # Record win
-            else:
-                text = "Loser  -- "
-                hand_history[counter] += ", 0"  # Record loss
-            for c in hand:
-                text += str(c) + "  "
+        generate(options.hands, options.output, options.seed,
+                 not options.quiet, options.players, options.evaluator)
 
-            text += " --- " + poker.name_of_hand(results[counter][0])
-            counter += 1
-            print(text)
 
-    f.write(hand_history[0] + "\n")
-    f.write(hand_history[1] + "\n")
-f.close()
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,173 @@
+import asyncio
+
+from engine import DecisionTreeAgent, knowledge_key
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed to decide batches at once
+    numpy = None
+
+""" AI Decision Service.
+This module makes the AI's decisions for many tables at once.
+
+Requests for decisions are gathered over a short window, then made together
+in one batch. The AI's odds are looked up by the scores of its hand, which
+most hands share with many others, so every request of a batch with the same
+scores shares one lookup, and a compiled snapshot looks every distinct set
+of scores up in one numpy search. The whole batch is handed to the worker
+pool in one go instead of one hop per decision. The busier the tables, the
+bigger the batches, and the less each decision costs.
+
+    service = DecisionService(knowledge, executor)
+    action = await service.decide(turn)
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+WINDOW = 0.002  # Seconds a request may wait for others to batch with
+MAX_BATCH = 256  # Most requests decided in one batch
+
+
+class DecisionService:
+    """
+    Class batching the decision requests of many tables, and keeping
+    counters of its queue and batches
+    """
+
+    def __init__(self, knowledge, executor=None, ratios=None, window=WINDOW,
+                 max_batch=MAX_BATCH):
+        """
+        Constructor for the DecisionService class.
+
+        :param knowledge: the knowledge the odds are looked up in
+        :param executor: the pool batches are decided on, or None to
+                         decide them on the event loop
+        :param ratios: the ratios of each phase, see Poker.PHASE_RATIOS
+        :param window: the seconds to gather requests for
+        :param max_batch: the most requests decided in one batch
+        """
+        self.agent = DecisionTreeAgent(knowledge, ratios=ratios)
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.timer = None
+        self.requests = 0
+        self.batches = 0
+        self.batched = 0
+        self.largest_batch = 0
+        self.deepest_queue = 0
+        self.lookups = 0
+
+    async def decide(self, turn):
+        """
+        Asks for the AI's decision on a turn.
+
+        :param turn: the Turn to act on
+        :return: the action, and the amount to raise by
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.pending.append((turn, future))
+        self.requests += 1
+        self.deepest_queue = max(self.deepest_queue, len(self.pending))
+        if len(self.pending) >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            self.timer = loop.call_later(self.window, self.flush)
+        return await future
+
+    def flush(self):
+        """
+        Sends the requests gathered so far off to be decided.
+        """
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        while self.pending:
+            batch = self.pending[:self.max_batch]
+            self.pending = self.pending[self.max_batch:]
+            self.batches += 1
+            self.batched += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            turns = [turn for turn, future in batch]
+            futures = [future for turn, future in batch]
+            if self.executor is None:
+                self.resolve(futures, self.decide_batch(turns))
+            else:
+                decided = asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.decide_batch, turns)
+                decided.add_done_callback(
+                    lambda done, futures=futures: self.resolve(futures, done))
+
+    def resolve(self, futures, decided):
+        """
+        Hands each request its decision. Runs on the event loop, so the
+        counters are only ever changed by one thread.
+
+        :param futures: the futures of the requests
+        :param decided: the decisions and lookups made, see decide_batch,
+                        or the future of them
+        """
+        if isinstance(decided, asyncio.Future):
+            error = decided.exception()
+            if error is not None:
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+            decided = decided.result()
+        decisions, lookups = decided
+        self.lookups += lookups
+        for future, decision in zip(futures, decisions):
+            # A table may have given up on its request in the meantime
+            if not future.done():
+                future.set_result(decision)
+
+    def decide_batch(self, turns):
+        """
+        Decides a batch of turns, looking up the odds of each distinct
+        set of scores only once.
+
+        :param turns: the Turns to act on
+        :return: a list of the decision of each turn, and the number of
+                 distinct sets of scores looked up
+        """
+        keys = [knowledge_key(turn.hand, turn.community_cards)
+                for turn in turns]
+        unique = list(dict.fromkeys(keys))
+        odds = {scores: int((found or 0) * 100) for scores, found in
+                zip(unique, self.agent.scores_odds_batch(unique))}
+        chances = [odds[scores] for scores in keys]
+
+        if numpy is None:
+            return [self.agent.decide(turn, ai_odds)
+                    for turn, ai_odds in zip(turns, chances)], len(unique)
+        # The whole batch is looked up in the compiled policy at once
+        decisions = self.agent.policy.decide_batch(
+            [turn.phase for turn in turns], chances,
+            [turn.highest_bid for turn in turns],
+            [turn.prev_round_highest for turn in turns],
+            [turn.bid for turn in turns])
+        return [decision if decision[0] == "raise" else decision[0]
+                for decision in decisions], len(unique)
+
+    def stats(self):
+        """
+        Gets the counters of the service.
+
+        :return: a dictionary of the requests, batches, the mean and
+                 largest batch size, the current and deepest queue, and
+                 the odds lookups made
+        """
+        return {"requests": self.requests, "batches": self.batches,
+                "mean_batch": self.batched / self.batches
+                if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "queue": len(self.pending),
+                "deepest_queue": self.deepest_queue,
+                "lookups": self.lookups}
@@ -1,4 +1,4 @@
-from random import shuffle
+import random
 
 """ Card and Deck Classes.
 This module holds classes which represent both cards and decks. 
@@ -11,22 +11,144 @@ Editors:
     Josh Getter
     Adam Stewart
     Josh Techentin
+
+Cards are passed around the game as plain integer codes. A code packs the
+card's value and symbol as (value - 2) * 4 + symbol, so sorting a list of
+codes sorts the cards by value. Card objects are only used when a card
+needs to be printed, and there is one shared Card for each code.
 """
 
+# Codes 52 and 53 are used for the jokers when a deck includes them.
+JOKER = 52
+
+
+def encode(symbol, value):
+    """
+    Gets the integer code of a card.
+
+    :param symbol: the pictorial symbol of the card
+    :param value: the numeric value of the card
+    :return: the integer code of the card
+    """
+    if value < 0:
+        return JOKER
+    return (value - 2) * 4 + symbol
+
+
+def value_of(code):
+    """
+    Gets the numeric value of a card code.
+
+    :param code: the integer code of the card
+    :return: the numeric value of the card, 2 through 14, or -1 for a joker
+    """
+    if code >= JOKER:
+        return -1
+    return (code >> 2) + 2
+
+
+def symbol_of(code):
+    """
+    Gets the pictorial symbol of a card code.
+
+    :param code: the integer code of the card
+    :return: the symbol of the card, 0 through 3, or -1 for a joker
+    """
+    if code >= JOKER:
+        return -1
+    return code & 3
+
+
+def to_card(code):
+    """
+    Gets the printable card of a card code.
+
+    :param code: the integer code of the card
+    :return: the Card represented by the code, shared by every deck
+    """
+    return CARDS[code]
+
+
+def card_text(symbol, value):
+    """
+    Gets the human readable symbol of a card.
+
+    :param symbol: the pictorial symbol of the card
+    :param value: the numeric value of the card
+    :return: The human readable symbol of the card
+    """
+    text = ""
+    if value < 0:
+        return "Joker"
+    elif value == 11:
+        text = "J"
+    elif value == 12:
+        text = "Q"
+    elif value == 13:
+        text = "K"
+    elif value == 14:
+        text = "A"
+    else:
+        text = str(value)
+
+    if symbol == 0:  # D-Diamonds
+        text += "D"
+    elif symbol == 1:  # H-Hearts
+        text += "H"
+    elif symbol == 2:  # S-Spade
+        text += "S"
+    else:  # C-Clubs
+        text += "C"
+
+    return text
+
 
 class Card:
     """
     Class to hold specific card data
+
+    There is only ever one Card of each code. Building a Card returns the
+    shared one, which can't be changed, and whose text is worked out once.
     """
-    def __init__(self, symbol, value):
+
+    __slots__ = ("symbol", "value", "code", "text")
+
+    def __new__(cls, symbol, value):
         """
         The constructor for a card.
 
         :param symbol: the pictorial symbol of the card
         :param value: the numeric value of the card
+        :return: the shared card of that symbol and value
+        """
+        if value != -1 and (value not in range(2, 15)
+                            or symbol not in range(4)):
+            raise ValueError("No card has symbol " + repr(symbol)
+                             + " and value " + repr(value) + ".")
+        code = encode(symbol, value)
+        card = CARDS.get(code)
+        if card is None:
+            card = super().__new__(cls)
+            if value < 0:
+                symbol = -1
+            object.__setattr__(card, "symbol", symbol)
+            object.__setattr__(card, "value", value)
+            object.__setattr__(card, "code", code)
+            object.__setattr__(card, "text", card_text(symbol, value))
+            CARDS[code] = card
+        return card
+
+    def __setattr__(self, name, value):
+        """
+        Stops a shared card from being changed.
+        """
+        raise AttributeError("cards can't be changed")
+
+    def __reduce__(self):
+        """
+        Unpickles to the shared card.
         """
-        self.symbol = symbol
-        self.value = value
+        return Card, (self.symbol, self.value)
 
     def __str__(self):
         """
@@ -34,64 +156,117 @@ class Card:
 
         :return: The human readable symbol of the card
         """
-        text = ""
-        if self.value < 0:
-            return "Joker"
-        elif self.value == 11:
-            text = "J"
-        elif self.value == 12:
-            text = "Q"
-        elif self.value == 13:
-            text = "K"
-        elif self.value == 14:
-            text = "A"
-        else:
-            text = str(self.value)
+        return self.text
+
+    def __hash__(self):
+        """
+        Hashes the card by its code.
+        """
+        return self.code
+
+    def __eq__(self, other):
+        """
+        Checks whether two cards have the same code.
+        """
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.code == other.code
+
+    def __lt__(self, other):
+        """
+        Orders cards by their codes, which is by value, then by symbol.
+        """
+        return self.code < other.code
 
-        if self.symbol == 0:  # D-Diamonds
-            text += "D"
-        elif self.symbol == 1:  # H-Hearts
-            text += "H"
-        elif self.symbol == 2:  # S-Spade
-            text += "S"
-        else:  # C-Clubs
-            text += "C"
 
-        return text
+# The shared cards, keyed by code
+CARDS = {}
+for code in range(JOKER):
+    Card(symbol_of(code), value_of(code))
+CARDS[JOKER + 1] = Card(-1, -1)
 
 
 class Deck:
     """
     Class to hold specific deck data
+
+    The cards are held in one fixed list of codes, which is never resized.
+    The top of the deck is an offset into the list, so cutting the whole
+    deck only moves the offset, and the cards dealt so far are the ones
+    between the top and the deal cursor.
     """
 
-    def __init__(self, add_jokers=False):
+    def __init__(self, add_jokers=False, rng=None):
         """
         Initializes the deck, and adds jokers if specified.
 
         :param add_jokers: whether or not to add jokers to the deck
+        :param rng: the random number generator to shuffle with,
+                    such as a seeded random.Random
         """
-        self.cards = []
-        self.inplay = []
+        self.rng = rng or random
+        self.order = []
         self.addJokers = add_jokers
         for symbol in range(0, 4):
             for value in range(2, 15):
-                self.cards.append(Card(symbol, value))
+                self.order.append(encode(symbol, value))
         if add_jokers:
             self.total_cards = 54
-            self.cards.append(Card(-1, -1))
-            self.cards.append(Card(-1, -1))
+            self.order.append(JOKER)
+            self.order.append(JOKER + 1)
         else:
             self.total_cards = 52
+        self.top = 0  # Index of the top card of the deck
+        self.dealt = 0  # Number of cards dealt from the top
+
+    @property
+    def cards(self):
+        """
+        Gets the cards left in the deck.
+
+        :return: a list of the codes of the cards left, top card first
+        """
+        return self.slice(self.dealt, self.total_cards)
+
+    @property
+    def inplay(self):
+        """
+        Gets the cards dealt from the deck.
+
+        :return: a list of the codes of the cards dealt, in the order dealt
+        """
+        return self.slice(0, self.dealt)
+
+    def slice(self, first, last):
+        """
+        Gets a run of cards, counted from the top of the deck.
+
+        :param first: the position of the first card
+        :param last: the position after the last card
+        :return: a list of the codes of the cards
+        """
+        first += self.top
+        last += self.top
+        if last <= self.total_cards:
+            return self.order[first:last]
+        if first >= self.total_cards:
+            return self.order[first - self.total_cards:last - self.total_cards]
+        # The run wraps around the end of the list
+        return self.order[first:] + self.order[:last - self.total_cards]
 
     def shuffle(self):
         """
         Shuffles the deck
         """
-
-        self.cards.extend(self.inplay)
-        self.inplay = []
-        shuffle(self.cards)
+        # Puts the dealt cards back under the rest, as they used to be
+        # gathered, so a seeded shuffle still deals the same games
+        start = (self.top + self.dealt) % self.total_cards
+        if start:
+            self.order[:] = self.order[start:] + self.order[:start]
+        self.top = 0
+        self.dealt = 0
+        # random.shuffle is an in place Fisher-Yates shuffle
+        self.rng.shuffle(self.order)
 
     def cut(self, amount):
         """
@@ -101,15 +276,21 @@ class Deck:
         :return: true if the deck was cut successfully and false otherwise
         """
 
-        if not amount or amount < 0 or amount >= len(self.cards):
+        if not amount or amount < 0 or amount >= self.cards_left():
             # returns false if cutting by a negative
             # number or more cards than in the deck
             return False
 
-        temp = []
-        for i in range(0, amount):
-            temp.append(self.cards.pop(0))
-        self.cards.extend(temp)
+        if not self.dealt:
+            self.top = (self.top + amount) % self.total_cards
+            return True
+
+        # Only the cards left are cut, so they are moved around in place
+        cards = self.cards
+        cards = cards[amount:] + cards[:amount]
+        for position in range(len(cards)):
+            index = (self.top + self.dealt + position) % self.total_cards
+            self.order[index] = cards[position]
         return True
 
     def deal(self, number_of_cards):
@@ -117,19 +298,30 @@ class Deck:
         Deals a specified number of cards.
 
         :param number_of_cards: the number of cards to deal
-        :return: a data dictionary of the cards in play
+        :return: a list of the codes of the cards dealt
         """
 
-        if number_of_cards > len(self.cards):
+        if number_of_cards > self.cards_left():
             return False  # Returns false if there are insufficient cards
 
-        inplay = []
-        for i in range(0, number_of_cards):
-            inplay.append(self.cards.pop(0))
-
-        self.inplay.extend(inplay)
+        inplay = self.slice(self.dealt, self.dealt + number_of_cards)
+        self.dealt += number_of_cards
         return inplay
 
+    def burn(self, number_of_cards):
+        """
+        Discards a specified number of cards from the top of the deck.
+
+        :param number_of_cards: the number of cards to burn
+        :return: true if the cards were burned and false otherwise
+        """
+
+        if number_of_cards > self.cards_left():
+            return False  # Returns false if there are insufficient cards
+
+        self.dealt += number_of_cards
+        return True
+
     def cards_left(self):
         """
         Gets the number of cards left in a deck.
@@ -137,4 +329,4 @@ class Deck:
         :return: the number of cards left in a deck
         """
 
-        return len(self.cards)
+        return self.total_cards - self.dealt
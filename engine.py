@@ -0,0 +1,574 @@
+import random
+import sys
+from abc import ABC, abstractmethod
+
+from betting import BettingRound
+from evaluator import HandState
+from holdem import Poker
+from policy import compile_policy
+
+""" Texas Hold Em Game Engine.
+This module runs whole hands of Texas Hold Em between player agents, without
+anyone at the keyboard.
+
+A hand is played by a generator. Each time a player has to act it yields a
+Turn, and it is sent back the action the player took:
+
+    steps = engine.hand()
+    turn = next(steps)
+    while True:
+        turn = steps.send(agents[turn.player].act(turn))
+
+until the generator stops with the result of the hand. play_hand does this
+with the engine's own agents. Something driving the generator itself, such as
+a server waiting on players over the network, never blocks the engine.
+
+An agent is anything with an act(turn) method returning an action, which is
+"fold", "hold", "call", or ("raise", amount). What happens during a hand is
+passed to observers, which are called with the name of an event and a
+dictionary of its data.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+ENTRY_FEE = 50  # Paid by every player at the start of a hand
+MAX_RAISES = 4  # Raises allowed in each betting phase
+
+
+def knowledge_key(hand, community_cards):
+    """
+    Gets the scores the AI looks its odds up by. The hand is scored with
+    each street dealt so far, and once the river is out the scores end with
+    a 1 when the hand is no better than the community cards alone.
+
+    :param hand: the two card codes of the hand
+    :param community_cards: the card codes of the community cards dealt
+    :return: a tuple of the scores
+    """
+    state = HandState(hand)
+    scores = [state.score()[0]]
+    for street in (community_cards[:3], community_cards[3:4],
+                   community_cards[4:5]):
+        if not street:
+            break
+        state.add_cards(street)
+        scores.append(state.score()[0])
+    if len(community_cards) == 5:
+        board_score = HandState(community_cards).score()[0]
+        scores.append(1 if scores[-1] == board_score else 0)
+    return tuple(scores)
+
+
+class Turn:
+    """
+    Class holding what a player can see when it is their turn to act
+    """
+
+    def __init__(self, player, phase, hand, community_cards, highest_bid,
+                 prev_round_highest, bid, raises_left, bids, statuses):
+        """
+        Constructor for the Turn class.
+
+        :param player: the id of the player to act
+        :param phase: which phase the game is in, 0 through 3
+        :param hand: the player's hand
+        :param community_cards: the community cards dealt so far
+        :param highest_bid: the highest bid currently out
+        :param prev_round_highest: the highest bid when the phase started
+        :param bid: the most the player has bid
+        :param raises_left: how many more raises this phase allows,
+                            or None for no limit
+        :param bids: a copy of every player's bid
+        :param statuses: a copy of every player's last action
+        """
+        self.player = player
+        self.phase = phase
+        self.hand = hand
+        self.community_cards = community_cards
+        self.highest_bid = highest_bid
+        self.prev_round_highest = prev_round_highest
+        self.bid = bid
+        self.raises_left = raises_left
+        self.bids = bids
+        self.statuses = statuses
+
+    @property
+    def to_call(self):
+        """
+        Gets how much the player must add to match the highest bid.
+
+        :return: the amount to call
+        """
+        return self.highest_bid - self.bid
+
+    @property
+    def actions(self):
+        """
+        Gets the actions the player may take.
+
+        :return: a list of the legal actions
+        """
+        actions = ["fold", "call" if self.to_call else "hold"]
+        if self.raises_left is None or self.raises_left > 0:
+            actions.append("raise")
+        return actions
+
+
+class GameEngine:
+    """
+    Class playing hands of Texas Hold Em between agents, and keeping
+    track of each player's chips
+    """
+
+    def __init__(self, agents, poker=None, rng=None, observers=(),
+                 entry_fee=ENTRY_FEE, max_raises=MAX_RAISES):
+        """
+        Constructor for the GameEngine class.
+
+        :param agents: the agent of each player, in seat order
+        :param poker: the game to deal and score with, a new one by default
+        :param rng: the random number generator to shuffle and cut with
+        :param observers: callables told of every event of a hand
+        :param entry_fee: what each player pays to play a hand
+        :param max_raises: how many raises each betting phase allows
+        """
+        self.agents = list(agents)
+        self.rng = rng or random
+        self.poker = poker or Poker(len(self.agents), rng=self.rng)
+        self.observers = list(observers)
+        self.entry_fee = entry_fee
+        self.max_raises = max_raises
+        self.dealer = 0
+        self.hands_played = 0
+        self.chips = [0] * len(self.agents)
+
+    def notify(self, event, data):
+        """
+        Tells every observer of an event.
+
+        :param event: the name of the event
+        :param data: a dictionary of the event's data
+        """
+        for observer in self.observers:
+            observer(event, data)
+
+    def play_hand(self):
+        """
+        Plays a hand, asking the engine's agents for every action.
+
+        :return: the result of the hand, see hand
+        """
+        steps = self.hand()
+        try:
+            turn = next(steps)
+            while True:
+                turn = steps.send(self.agents[turn.player].act(turn))
+        except StopIteration as stop:
+            return stop.value
+
+    def hand(self):
+        """
+        Plays a hand, yielding a Turn whenever a player has to act and
+        taking the action sent back. The dealer moves on once it is over.
+
+        :return: a dictionary of the hands, the community cards, the score
+                 of each hand, each player's bid and last action, the
+                 winners of the showdown, the winners of the pot, the pot
+                 and the chips each player won or lost
+        """
+        number_of_players = len(self.agents)
+        self.notify("start", {"game": self.hands_played + 1,
+                              "dealer": self.dealer,
+                              "entry_fee": self.entry_fee})
+        self.poker.shuffle()
+        if not self.poker.cut(self.rng.randint(1, 51)):
+            # Cannot cut 0, or the number of cards in the deck
+            sys.exit("*** ERROR ***: Invalid amount entered to cut the deck.")
+        hands = self.poker.distribute()
+        if not hands:
+            sys.exit("*** ERROR ***: Insufficient cards to distribute.")
+        self.notify("deal", {"hands": hands})
+
+        bids = [self.entry_fee] * number_of_players
+        statuses = ["hold"] * number_of_players
+        community_cards = []
+        for phase in range(4):
+            if phase:
+                cards = self.poker.get_flop() if phase == 1 \
+                    else self.poker.get_one()
+                if not cards:
+                    sys.exit("*** ERROR ***: "
+                             "Insufficient cards to distribute.")
+                community_cards.extend(cards)
+                self.notify("board", {"phase": phase,
+                                      "community_cards": community_cards})
+            yield from self.betting(phase, hands, community_cards,
+                                    bids, statuses)
+
+        # Every hand is scored, so the showdown is known even after folds
+        results = self.poker.determine_score(community_cards, hands)
+        showdown_winners = self.winners(results, range(number_of_players))
+        active = [player for player in range(number_of_players)
+                  if statuses[player] != "fold"]
+        winners = self.winners(results, active)
+
+        chips = self.settle(bids, winners)
+        for player in range(number_of_players):
+            self.chips[player] += chips[player]
+        result = {"hands": hands, "community_cards": community_cards,
+                  "results": results, "bids": bids, "statuses": statuses,
+                  "showdown_winners": showdown_winners, "winners": winners,
+                  "pot": sum(bids), "chips": chips}
+        self.notify("result", result)
+
+        self.hands_played += 1
+        self.dealer = (self.dealer + 1) % number_of_players
+        return result
+
+    def betting(self, phase, hands, community_cards, bids, statuses):
+        """
+        Plays a betting phase, see BettingRound. Players act in turn from
+        the dealer's left.
+
+        :param phase: which phase the game is in, 0 through 3
+        :param hands: the hand of each player
+        :param community_cards: the community cards dealt so far
+        :param bids: each player's bid, updated in place
+        :param statuses: each player's last action, updated in place
+        """
+        betting = BettingRound(bids, statuses,
+                               (self.dealer + 1) % len(hands),
+                               self.max_raises)
+        while not betting.done:
+            player = betting.player
+            turn = Turn(player, phase, hands[player], list(community_cards),
+                        betting.highest_bid, betting.prev_round_highest,
+                        bids[player], betting.raises_left, list(bids),
+                        list(statuses))
+            action = yield turn
+            amount = 0
+            if isinstance(action, (tuple, list)):
+                action, amount = action
+            action, amount = betting.act(action, amount)
+            self.notify("action", {"player": player, "phase": phase,
+                                   "action": action, "amount": amount,
+                                   "highest_bid": betting.highest_bid})
+
+    def winners(self, results, players):
+        """
+        Finds which of some players have the best hand.
+
+        :param results: the score of every player's hand
+        :param players: the ids of the players to compare
+        :return: a list of the ids of the winners
+        """
+        players = list(players)
+        if len(players) == 1:
+            return players
+        best = self.poker.determine_winner([results[player]
+                                            for player in players])
+        if isinstance(best, list):
+            return [players[index] for index in best]
+        return [players[best]]
+
+    def settle(self, bids, winners):
+        """
+        Works out the chips each player won or lost. Losers pay their bids,
+        which are split between the winners. Chips that don't split evenly
+        go to the winners closest to the dealer's left.
+
+        :param bids: each player's bid
+        :param winners: the ids of the winners
+        :return: a list of the chips each player won, negative for losses
+        """
+        number_of_players = len(bids)
+        chips = [0] * number_of_players
+        for player in range(number_of_players):
+            if player not in winners:
+                chips[player] = -bids[player]
+        share, left_over = divmod(-sum(chips), len(winners))
+        order = sorted(winners, key=lambda player:
+                       (player - self.dealer - 1) % number_of_players)
+        for player in order:
+            chips[player] = share
+            if left_over:
+                chips[player] += 1
+                left_over -= 1
+        return chips
+
+
+class Agent(ABC):
+    """
+    Class every player agent is based on
+    """
+
+    @abstractmethod
+    def act(self, turn):
+        """
+        Decides what to do on a turn.
+
+        :param turn: the Turn to act on
+        :return: "fold", "hold", "call", or ("raise", amount)
+        """
+
+
+class DecisionTreeAgent(Agent):
+    """
+    Agent playing like the AI, bidding up to a limit set by its odds of
+    winning with the decision tree of Poker, compiled by policy.py
+    """
+
+    def __init__(self, knowledge=None, odds=None, ratios=None, verbose=False):
+        """
+        Constructor for the DecisionTreeAgent class.
+
+        :param knowledge: the knowledge the odds are looked up in
+        :param odds: a callable taking the hand and community cards and
+                     returning the odds of winning, or None to look them
+                     up in the knowledge instead
+        :param ratios: the ratios of each phase, see Poker.PHASE_RATIOS
+        :param verbose: whether or not to print the odds of every phase
+        """
+        self.knowledge = knowledge
+        self.odds = odds
+        self.ratios = ratios
+        self.policy = compile_policy(ratios)
+        self.verbose = verbose
+        self.cached_odds = {}
+
+    def winning_odds(self, hand, community_cards, phase):
+        """
+        Gets the odds of winning, which are only worked out once a phase.
+
+        :param hand: the two card codes of the hand
+        :param community_cards: the community cards dealt so far
+        :param phase: which phase the game is in
+        :return: the odds of winning, 0 through 100
+        """
+        key = (tuple(hand), tuple(community_cards))
+        chances = self.cached_odds.get(key)
+        if chances is not None:
+            return chances
+
+        odds = self.hand_odds(hand, community_cards)
+        chances = int((odds or 0) * 100)
+        if self.verbose:
+            print("PHASE " + str(phase) + " ODDS: " + str(odds))
+        self.cached_odds = {key: chances}
+        return chances
+
+    def hand_odds(self, hand, community_cards):
+        """
+        Works out the odds of winning with a hand.
+
+        :param hand: the two card codes of the hand
+        :param community_cards: the community cards dealt so far
+        :return: the odds of winning, or None if none are known
+        """
+        odds = None
+        if self.odds is not None:
+            odds = self.odds(hand, community_cards)
+        if odds is None:
+            odds = self.scores_odds(knowledge_key(hand, community_cards))
+        return odds
+
+    def scores_odds(self, scores):
+        """
+        Looks the odds of some scores up in the knowledge. Unseen scores
+        fall back to the longest prefix of them seen before.
+
+        :param scores: a tuple of the scores so far, see knowledge_key
+        :return: the odds of winning, or None if none are known
+        """
+        odds = None
+        while scores and odds is None:
+            odds = self.lookup(scores)
+            scores = scores[:-1]
+        return odds
+
+    def scores_odds_batch(self, scores_list):
+        """
+        Looks the odds of many sets of scores up at once, falling back to
+        their longest prefixes seen before as scores_odds does. Every
+        prefix is looked up in one batch when the knowledge can.
+
+        :param scores_list: a list of tuples of the scores so far
+        :return: a list of the odds of each, or None where none are known
+        """
+        if not hasattr(self.knowledge, "odds_batch"):
+            return [self.scores_odds(scores) for scores in scores_list]
+        prefixes = [scores[:length] for scores in scores_list
+                    for length in range(len(scores), 0, -1)]
+        found = iter(self.knowledge.odds_batch(prefixes))
+        odds_list = []
+        for scores in scores_list:
+            odds = None
+            for length in range(len(scores)):
+                prefix_odds = next(found)
+                if odds is None:
+                    odds = prefix_odds
+            odds_list.append(odds)
+        return odds_list
+
+    def lookup(self, scores):
+        """
+        Looks the odds of some scores up in the knowledge.
+
+        :param scores: a tuple of the scores so far
+        :return: the odds of winning, or None if none are known
+        """
+        if self.knowledge is None:
+            return None
+        if hasattr(self.knowledge, "odds"):
+            return self.knowledge.odds(scores)
+        # Plain dictionaries of knowledge are averaged line by line
+        odds = 0
+        total = 0
+        for data, percentage in self.knowledge.items():
+            if Poker.compare_records(scores, data.split(",")):
+                odds += float(percentage)
+                total += 1
+        return odds / total if total else None
+
+    def act(self, turn):
+        """
+        Decides what to do on a turn with the decision tree.
+
+        :param turn: the Turn to act on
+        :return: the action, and the amount to raise by
+        """
+        return self.decide(turn, self.winning_odds(turn.hand,
+                                                   turn.community_cards,
+                                                   turn.phase))
+
+    def decide(self, turn, ai_odds):
+        """
+        Decides what to do on a turn with the decision tree, given the
+        odds of winning.
+
+        :param turn: the Turn to act on
+        :param ai_odds: the odds of winning, 0 through 100
+        :return: the action, and the amount to raise by
+        """
+        # The decision tree is looked up in its compiled table
+        action, amount = self.policy.decide(turn.phase, ai_odds,
+                                            turn.highest_bid,
+                                            turn.prev_round_highest,
+                                            turn.bid)
+        if action == "raise":
+            return "raise", amount
+        return action
+
+
+class ScriptedAgent(Agent):
+    """
+    Agent taking a fixed list of actions in order, then checking or
+    calling once the list runs out
+    """
+
+    def __init__(self, actions):
+        """
+        Constructor for the ScriptedAgent class.
+
+        :param actions: the actions to take, in order
+        """
+        self.actions = list(actions)
+        self.taken = 0
+
+    def act(self, turn):
+        """
+        Takes the next action of the script.
+
+        :param turn: the Turn to act on
+        :return: the next action
+        """
+        if self.taken >= len(self.actions):
+            return "call"
+        action = self.actions[self.taken]
+        self.taken += 1
+        return action
+
+
+class RandomAgent(Agent):
+    """
+    Agent picking a random legal action on every turn
+    """
+
+    def __init__(self, rng=None, fold_chance=0.1, raise_chance=0.2,
+                 raise_amounts=(10, 25, 50)):
+        """
+        Constructor for the RandomAgent class.
+
+        :param rng: the random number generator to decide with
+        :param fold_chance: the chance of folding when facing a bid
+        :param raise_chance: the chance of raising
+        :param raise_amounts: the amounts a raise may be by
+        """
+        self.rng = rng or random.Random()
+        self.fold_chance = fold_chance
+        self.raise_chance = raise_chance
+        self.raise_amounts = raise_amounts
+
+    def act(self, turn):
+        """
+        Picks a random action.
+
+        :param turn: the Turn to act on
+        :return: the action, and the amount to raise by
+        """
+        roll = self.rng.random()
+        if turn.to_call and roll < self.fold_chance:
+            return "fold"
+        if "raise" in turn.actions and roll > 1 - self.raise_chance:
+            return "raise", self.rng.choice(self.raise_amounts)
+        return "call"
+
+
+class HumanAgent(Agent):
+    """
+    Agent asking a person what to do
+    """
+
+    def __init__(self, ask=input, tell=print):
+        """
+        Constructor for the HumanAgent class.
+
+        :param ask: the function prompting for and reading a line
+        :param tell: the function showing a message
+        """
+        self.ask = ask
+        self.tell = tell
+
+    def act(self, turn):
+        """
+        Asks until a valid action is entered.
+
+        :param turn: the Turn to act on
+        :return: the action, and the amount to raise by
+        """
+        while True:
+            if turn.to_call:
+                action = self.ask("Highest bid is currently "
+                                  + str(turn.highest_bid)
+                                  + ".  Please type fold, call, raise.\n")
+            else:
+                action = self.ask("You're currently matched with the highest"
+                                  " bids (" + str(turn.highest_bid) + ")."
+                                  "  Would you like to fold, hold, or raise?"
+                                  "\n")
+            action = action.strip().lower()
+            if not Poker.check_action(action):
+                self.tell("Invalid answer.")
+                continue
+            if action != "raise":
+                return action
+            try:
+                return action, int(self.ask("Please enter the numerical "
+                                            "amount you'd like to raise "
+                                            "by.\n"))
+            except ValueError:
+                self.tell("Not a valid number.")
@@ -0,0 +1,276 @@
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import combinations
+from math import comb, sqrt
+
+from evaluator import CARD_BITS, CARD_PRIMES, FLUSHES, RANKS, HandState, \
+    build_tables
+
+""" Heads Up Equity.
+This module works out how often a hand beats a single random opponent.
+
+exact_equity deals every runout of the board, and compares the hand against
+every holding the opponent could have. The board is only ranked once per
+runout, so each opponent holding costs one multiplication and a table lookup.
+
+monte_carlo_equity samples runouts and opponent holdings in batches spread
+over a pool of processes, and stops once its estimate is precise enough.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+# Most hands exact_equity will rank before sampling runouts instead.
+# An exhaustive flop is about a million hands.
+MAX_EVALUATIONS = 1200000
+
+# z score of a two sided 95% confidence interval
+Z_95 = 1.96
+
+
+def tally_runout(hero_rank, board, rest):
+    """
+    Compares a hand against every opponent holding on a complete board.
+
+    :param hero_rank: the rank of the hand with the board
+    :param board: the HandState of the five board cards
+    :param rest: the card codes the opponent may hold
+    :return: the number of opponent holdings won, tied and lost against
+    """
+    wins = 0
+    ties = 0
+    losses = 0
+    product = board.product
+
+    # A five card board can only hold three or more cards of one symbol,
+    # and only that symbol can give the opponent a flush
+    flush_symbol = -1
+    for symbol in range(4):
+        if board.suit_counts[symbol] >= 3:
+            flush_symbol = symbol
+
+    for i in range(len(rest)):
+        first = rest[i]
+        first_product = product * CARD_PRIMES[first]
+        for second in rest[i + 1:]:
+            rank = 0
+            if flush_symbol >= 0:
+                count = board.suit_counts[flush_symbol]
+                mask = board.suit_masks[flush_symbol]
+                if first & 3 == flush_symbol:
+                    count += 1
+                    mask |= CARD_BITS[first]
+                if second & 3 == flush_symbol:
+                    count += 1
+                    mask |= CARD_BITS[second]
+                if count >= 5:
+                    rank = FLUSHES[mask]
+            if not rank:
+                rank = RANKS[first_product * CARD_PRIMES[second]]
+
+            if hero_rank > rank:
+                wins += 1
+            elif hero_rank == rank:
+                ties += 1
+            else:
+                losses += 1
+    return wins, ties, losses
+
+
+def exact_equity(hole, board=(), max_evaluations=MAX_EVALUATIONS,
+                 time_budget=None, rng=None):
+    """
+    Works out the chances of a hand winning, tying and losing against a
+    single random opponent by enumerating every runout and opponent holding.
+
+    When enumerating would rank more than max_evaluations hands, runouts are
+    sampled instead. When time_budget runs out the runouts ranked so far are
+    used. Both give an estimate, which is flagged by "exact" being False.
+
+    :param hole: the two card codes of the hand
+    :param board: the card codes of the community cards dealt so far
+    :param max_evaluations: the most opponent holdings to rank
+    :param time_budget: the most seconds to spend, or None for no limit
+    :param rng: the random number generator to sample with
+    :return: a dictionary of the win, tie and loss fractions, whether they
+             are exact, and the number of opponent holdings ranked
+    """
+    if not RANKS:
+        build_tables()
+    if rng is None:
+        rng = random.Random()
+    start = time.perf_counter()
+
+    board = list(board)
+    dead = set(hole) | set(board)
+    remaining = [card for card in range(52) if card not in dead]
+    needed = 5 - len(board)
+    opponents = comb(len(remaining) - needed, 2)
+
+    exact = comb(len(remaining), needed) * opponents <= max_evaluations
+    if exact:
+        runouts = list(combinations(remaining, needed))
+        if time_budget is not None:
+            # Shuffled, so stopping early still leaves a fair sample
+            rng.shuffle(runouts)
+    else:
+        runouts = (rng.sample(remaining, needed)
+                   for i in range(max(1, max_evaluations // opponents)))
+
+    # Work shared by every runout
+    hero_base = HandState(hole)
+    hero_base.add_cards(board)
+    board_base = HandState(board)
+
+    wins = 0
+    ties = 0
+    losses = 0
+    for runout in runouts:
+        if time_budget is not None \
+                and time.perf_counter() - start > time_budget \
+                and wins + ties + losses:
+            exact = False
+            break
+
+        hero = hero_base.copy()
+        hero.add_cards(runout)
+        full_board = board_base.copy()
+        full_board.add_cards(runout)
+        rest = [card for card in remaining if card not in runout]
+
+        won, tied, lost = tally_runout(hero.rank(), full_board, rest)
+        wins += won
+        ties += tied
+        losses += lost
+
+    total = wins + ties + losses
+    return {"win": wins / total, "tie": ties / total,
+            "loss": losses / total, "exact": exact, "evaluations": total}
+
+
+def sample_equity(hole, board, samples, seed):
+    """
+    Samples runouts and opponent holdings against a hand. Each batch is
+    given its own seed, so every batch draws from an independent stream.
+
+    :param hole: the two card codes of the hand
+    :param board: the card codes of the community cards dealt so far
+    :param samples: how many runouts to sample
+    :param seed: the seed of this batch's random number generator
+    :return: the number of samples won, tied and lost
+    """
+    rng = random.Random(seed)
+    board = list(board)
+    dead = set(hole) | set(board)
+    remaining = [card for card in range(52) if card not in dead]
+    needed = 5 - len(board)
+
+    hero_base = HandState(hole)
+    hero_base.add_cards(board)
+    board_base = HandState(board)
+
+    wins = 0
+    ties = 0
+    for i in range(samples):
+        cards = rng.sample(remaining, needed + 2)
+        runout = cards[2:]
+        hero = hero_base.copy()
+        hero.add_cards(runout)
+        villain = board_base.copy()
+        villain.add_cards(cards)
+
+        hero_rank = hero.rank()
+        villain_rank = villain.rank()
+        if hero_rank > villain_rank:
+            wins += 1
+        elif hero_rank == villain_rank:
+            ties += 1
+    return wins, ties, samples - wins - ties
+
+
+def confidence_width(wins, ties, total):
+    """
+    Gets the width of the 95% confidence interval of an equity estimate,
+    where a tie counts as half a win.
+
+    :param wins: the number of samples won
+    :param ties: the number of samples tied
+    :param total: the number of samples
+    :return: the width of the confidence interval
+    """
+    equity = (wins + ties / 2) / total
+    variance = (wins + ties / 4) / total - equity * equity
+    return 2 * Z_95 * sqrt(max(variance, 0) / total)
+
+
+def monte_carlo_equity(hole, board=(), tolerance=0.02, batch_size=2000,
+                       max_samples=2000000, seed=None, executor=None,
+                       workers=None):
+    """
+    Estimates the chances of a hand winning, tying and losing against a
+    single random opponent. Batches of samples are run across a process pool
+    until the 95% confidence interval of the equity is narrower than the
+    tolerance, or max_samples have been drawn.
+
+    :param hole: the two card codes of the hand
+    :param board: the card codes of the community cards dealt so far
+    :param tolerance: the widest the confidence interval may be
+    :param batch_size: how many samples each batch draws
+    :param max_samples: the most samples to draw
+    :param seed: the seed each batch's seed is drawn from
+    :param executor: the pool to run batches on, kept open between calls
+                     to save starting new processes for every decision
+    :param workers: the number of processes to keep busy, which is also
+                    the size of a pool made for this call
+    :return: a dictionary of the win, tie and loss fractions, the equity,
+             the width of its confidence interval and the number of samples
+    """
+    if max_samples < 1 or batch_size < 1:
+        raise ValueError("max_samples and batch_size must be at least 1.")
+    seeds = random.Random(seed)
+    pool = executor
+    if pool is None:
+        pool = ProcessPoolExecutor(workers)
+    in_flight = workers or os.cpu_count() or 1
+    hole = list(hole)
+    board = list(board)
+
+    wins = 0
+    ties = 0
+    losses = 0
+    submitted = 0
+    pending = set()
+    try:
+        while True:
+            # Keeps every worker busy with a batch of its own
+            while len(pending) < in_flight and submitted < max_samples:
+                samples = min(batch_size, max_samples - submitted)
+                pending.add(pool.submit(sample_equity, hole, board, samples,
+                                        seeds.getrandbits(64)))
+                submitted += samples
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                won, tied, lost = future.result()
+                wins += won
+                ties += tied
+                losses += lost
+
+            total = wins + ties + losses
+            width = confidence_width(wins, ties, total)
+            if width < tolerance or not pending and submitted >= max_samples:
+                break
+    finally:
+        for future in pending:
+            future.cancel()
+        if executor is None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return {"win": wins / total, "tie": ties / total, "loss": losses / total,
+            "equity": (wins + ties / 2) / total, "width": width,
+            "samples": total}
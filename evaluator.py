@@ -0,0 +1,366 @@
+import threading
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed by score_batch
+    numpy = None
+
+""" Table Driven Hand Evaluator.
+This module scores hands of one to seven card codes with a few table lookups.
+
+Every card value is given a prime number, so the product of a hand's primes
+identifies the values in the hand no matter their order. The product is looked
+up in a table holding the rank of every possible set of values. Hands holding
+five or more cards of one symbol instead look up the bit mask of that symbol's
+values in a table of flushes.
+
+A rank is a single integer, where a higher rank is a better hand. The category
+of the hand (see Poker.name_of_hand) is held above bit 20 and the kickers are
+packed below it, four bits each, highest first.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+# The prime of each card value, from 2 up to 14 (the ace)
+PRIMES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+# The prime and value bit of every card code, see deck.encode for the layout
+CARD_PRIMES = tuple(PRIMES[code >> 2] for code in range(52))
+CARD_BITS = tuple(1 << (code >> 2) for code in range(52))
+
+# The number of bits set in every 13 bit value mask
+BIT_COUNT = tuple(bin(mask).count("1") for mask in range(1 << 13))
+
+# Bits of the value mask making up the ace low straight (A, 2, 3, 4, 5)
+WHEEL = 0b1000000001111
+
+# Filled in by build_tables the first time a hand is evaluated
+RANKS = {}
+FLUSHES = []
+TABLES_LOCK = threading.Lock()
+
+# numpy copies of the tables, filled in by build_batch_tables
+BATCH_TABLES = {}
+
+
+def make_rank(category, kicker):
+    """
+    Packs a category and its kickers into a single comparable rank.
+
+    :param category: the numerical index of the hand
+    :param kicker: the card values used in the event of a tie, highest first
+    :return: the rank of the hand
+    """
+    rank = category << 20
+    shift = 16
+    for value in kicker:
+        rank |= value << shift
+        shift -= 4
+    return rank
+
+
+def category_of(rank):
+    """
+    Gets the category of a rank.
+
+    :param rank: the rank of the hand
+    :return: the numerical index of the hand
+    """
+    return rank >> 20
+
+
+def kicker_of(rank):
+    """
+    Unpacks the kickers of a rank.
+
+    :param rank: the rank of the hand
+    :return: the list of kicker values, highest first
+    """
+    kicker = []
+    shift = 16
+    while shift >= 0:
+        value = (rank >> shift) & 15
+        if value == 0:  # Card values start at 2, so 0 ends the kickers
+            break
+        kicker.append(value)
+        shift -= 4
+    return kicker
+
+
+def straight_high(mask):
+    """
+    Finds the highest straight within a mask of card values.
+
+    :param mask: the bit mask of card values, bit 0 being a 2
+    :return: the value of the straight's highest card, or 0 if there is none
+    """
+    for high in range(14, 5, -1):
+        run = 0b11111 << (high - 6)
+        if mask & run == run:
+            return high
+    if mask & WHEEL == WHEEL:
+        return 5
+    return 0
+
+
+def rank_of_values(counts):
+    """
+    Ranks a hand that does not hold a flush.
+
+    :param counts: the number of cards held of each value, indexed by value
+    :return: the rank of the hand
+    """
+    # Values sorted by how many are held, then by the value itself
+    groups = sorted([(count, value) for value, count in enumerate(counts)
+                     if count], reverse=True)
+    values = [value for count, value in groups]
+    mask = 0
+    for value in values:
+        mask |= 1 << (value - 2)
+
+    count = groups[0][0]
+    if count == 4:
+        return make_rank(7, [values[0]] + sorted(values[1:])[-1:])
+    if count == 3 and len(groups) > 1 and groups[1][0] >= 2:
+        return make_rank(6, values[:2])
+
+    high = straight_high(mask)
+    if high:
+        return make_rank(4, [high])
+
+    singles = sorted([value for count, value in groups if count == 1],
+                     reverse=True)
+    if count == 3:
+        return make_rank(3, [values[0]] + singles[:2])
+    if count == 2 and len(groups) > 1 and groups[1][0] == 2:
+        # A third pair can still be used as the kicker
+        rest = sorted(values[2:], reverse=True)
+        return make_rank(2, values[:2] + rest[:1])
+    if count == 2:
+        return make_rank(1, [values[0]] + singles[:3])
+    return make_rank(0, singles[:5])
+
+
+def rank_of_flush(mask):
+    """
+    Ranks a hand holding five or more cards of a single symbol.
+
+    :param mask: the bit mask of the values of the flush's cards
+    :return: the rank of the hand
+    """
+    high = straight_high(mask)
+    if high == 14:
+        return make_rank(9, [14])
+    if high:
+        return make_rank(8, [high])
+    values = [value for value in range(14, 1, -1)
+              if mask & (1 << (value - 2))]
+    return make_rank(5, values[:5])
+
+
+def build_tables():
+    """
+    Fills in the rank and flush tables. This only needs to run once.
+    """
+    with TABLES_LOCK:
+        if RANKS:
+            return
+
+        ranks = {}
+        counts = [0] * 15
+
+        # Walks every multiset of up to seven values,
+        # holding at most four of each
+        def walk(value, size, product):
+            if size:
+                ranks[product] = rank_of_values(counts)
+            if size == 7:
+                return
+            for next_value in range(value, 15):
+                if counts[next_value] < 4:
+                    counts[next_value] += 1
+                    walk(next_value, size + 1,
+                         product * PRIMES[next_value - 2])
+                    counts[next_value] -= 1
+
+        walk(2, 0, 1)
+
+        flushes = []
+        for mask in range(1 << 13):
+            if BIT_COUNT[mask] >= 5:
+                flushes.append(rank_of_flush(mask))
+            else:
+                flushes.append(0)
+
+        # Callers only check that RANKS is filled, so it is filled last,
+        # and in one step, for threads scoring while the tables are built
+        FLUSHES[:] = flushes
+        RANKS.update(ranks)
+
+
+def evaluate(hand):
+    """
+    Ranks a hand of one to seven card codes. The hand does not need sorting.
+
+    :param hand: the card codes of the hand
+    :return: the rank of the hand, higher ranks being better hands
+    """
+    if not RANKS:
+        build_tables()
+
+    product = 1
+    suits = [0, 0, 0, 0]
+    for card in hand:
+        product *= CARD_PRIMES[card]
+        suits[card & 3] |= CARD_BITS[card]
+
+    for mask in suits:
+        if FLUSHES[mask]:
+            return FLUSHES[mask]
+    return RANKS[product]
+
+
+def score(hand):
+    """
+    Scores a hand in the same form as Poker.score.
+
+    :param hand: the card codes of the hand
+    :return: the score, and the kicker to be used in the event of a tie
+    """
+    rank = evaluate(hand)
+    return [rank >> 20, kicker_of(rank)]
+
+
+def build_batch_tables():
+    """
+    Copies the tables into numpy arrays for score_batch.
+    This only needs to run once.
+    """
+    if BATCH_TABLES:
+        return
+    build_tables()
+
+    # Sorted products, so a product's rank is found with a binary search
+    products = numpy.array(sorted(RANKS), dtype=numpy.int64)
+    BATCH_TABLES["products"] = products
+    BATCH_TABLES["ranks"] = numpy.array([RANKS[product]
+                                         for product in products.tolist()],
+                                        dtype=numpy.int64)
+    BATCH_TABLES["flushes"] = numpy.array(FLUSHES, dtype=numpy.int64)
+    BATCH_TABLES["primes"] = numpy.array(CARD_PRIMES, dtype=numpy.int64)
+    BATCH_TABLES["bits"] = numpy.array(CARD_BITS, dtype=numpy.int64)
+
+
+def score_batch(hands):
+    """
+    Scores many hands at once without a Python loop per hand.
+
+    :param hands: an (N, 7) array of card codes, one hand per row.
+                  Rows of one to six cards are also accepted.
+    :return: an array of the N categories and an array of the N ranks
+    """
+    if numpy is None:
+        raise ImportError("score_batch needs numpy to be installed.")
+    build_batch_tables()
+
+    hands = numpy.asarray(hands, dtype=numpy.int64)
+    if hands.ndim != 2 or not 0 < hands.shape[1] <= 7:
+        raise ValueError("hands must be an (N, 7) array of card codes.")
+
+    products = BATCH_TABLES["primes"][hands].prod(axis=1)
+    ranks = BATCH_TABLES["ranks"][
+        numpy.searchsorted(BATCH_TABLES["products"], products)]
+
+    # Packs the value mask of each symbol 13 bits apart. Each card sets a
+    # different bit, so summing them is the same as or-ing them.
+    masks = (BATCH_TABLES["bits"][hands] << (13 * (hands & 3))).sum(axis=1)
+    for symbol in range(4):
+        flushes = BATCH_TABLES["flushes"][(masks >> (13 * symbol)) & 0x1FFF]
+        ranks = numpy.where(flushes > 0, flushes, ranks)
+
+    return ranks >> 20, ranks
+
+
+class HandState:
+    """
+    Class holding a hand that is scored as cards are added to it,
+    so each street only costs the work of its new cards
+    """
+
+    def __init__(self, cards=()):
+        """
+        Constructor for the HandState class.
+
+        :param cards: the card codes the hand starts with
+        """
+        self.size = 0
+        self.product = 1  # Product of the primes of the card values
+        self.value_counts = [0] * 15  # Cards held of each value
+        self.suit_counts = [0, 0, 0, 0]  # Cards held of each symbol
+        self.value_mask = 0  # Straight mask of every value held
+        self.suit_masks = [0, 0, 0, 0]  # Straight mask of each symbol
+        self.add_cards(cards)
+
+    def add(self, card):
+        """
+        Adds one card to the hand.
+
+        :param card: the card code to add
+        """
+        symbol = card & 3
+        self.size += 1
+        self.product *= CARD_PRIMES[card]
+        self.value_counts[(card >> 2) + 2] += 1
+        self.suit_counts[symbol] += 1
+        self.value_mask |= CARD_BITS[card]
+        self.suit_masks[symbol] |= CARD_BITS[card]
+
+    def add_cards(self, cards):
+        """
+        Adds several cards to the hand.
+
+        :param cards: the card codes to add
+        """
+        for card in cards:
+            self.add(card)
+
+    def copy(self):
+        """
+        Copies the hand, so the copy can be added to on its own.
+
+        :return: a new HandState holding the same cards
+        """
+        state = HandState()
+        state.size = self.size
+        state.product = self.product
+        state.value_counts = list(self.value_counts)
+        state.suit_counts = list(self.suit_counts)
+        state.value_mask = self.value_mask
+        state.suit_masks = list(self.suit_masks)
+        return state
+
+    def rank(self):
+        """
+        Ranks the cards added so far.
+
+        :return: the rank of the hand, higher ranks being better hands
+        """
+        if not RANKS:
+            build_tables()
+        for symbol in range(4):
+            if self.suit_counts[symbol] >= 5:
+                return FLUSHES[self.suit_masks[symbol]]
+        return RANKS[self.product]
+
+    def score(self):
+        """
+        Scores the cards added so far in the same form as Poker.score.
+
+        :return: the score, and the kicker to be used in the event of a tie
+        """
+        rank = self.rank()
+        return [rank >> 20, kicker_of(rank)]
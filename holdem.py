@@ -1,6 +1,9 @@
-from deck import Deck
+from betting import BettingRound
+from deck import Deck, to_card
+import equity
+import evaluator
+import knowledge as knowledge_base
 import sys
-from io import StringIO
 
 """ Texas Hold Em Poker Game.
 This module simulates a poker game. 
@@ -21,18 +24,40 @@ class Poker:
     Class holding logic for a Texas Hold Em poker game
     """
 
-    def __init__(self, number_of_players, debug=False):
+    # The hand evaluators score can be backed by
+    EVALUATORS = ("legacy", "table")
+
+    # Ratios used to determine how valuable the AI's odds are in each
+    # phase, as (odds threshold, ratio at or above it, ratio below it).
+    # *TWEEK THESE FOR BETTER AI*
+    PHASE_RATIOS = ((0, 2/5, 2/5),
+                    (80, 5/5, 3/5),
+                    (80, 6/5, 2/5),
+                    (85, 7/5, 1/5))
+
+    def __init__(self, number_of_players, debug=False, evaluator="legacy",
+                 cache=None, rng=None):
         """
         Constructor for the Poker class.
         :param number_of_players: The number of players in the game
         :param debug: whether or not to print extra messages
+        :param evaluator: which of the EVALUATORS scores the hands
+        :param cache: an optional ScoreCache put in front of score, which
+                      may be shared between games
+        :param rng: the random number generator to shuffle with
         """
-        self.deck = Deck()
+        self.deck = Deck(rng=rng)
         if number_of_players < 2 or number_of_players > 10:
             sys.exit(
                 "*** ERROR ***: Invalid number of players."
                 " It must be between 2 and 10.")
+        if evaluator not in self.EVALUATORS:
+            sys.exit(
+                "*** ERROR ***: Invalid evaluator."
+                " It must be one of " + ", ".join(self.EVALUATORS) + ".")
         self.number_of_players = number_of_players
+        self.evaluator = evaluator
+        self.cache = cache
         # This will print out the debug statements during execution
         self.debug = debug
         # Here is were we would extend and add betting, number of players etc..
@@ -57,7 +82,7 @@ class Poker:
         :return: the cards drawn for the flop
         """
         # Burns 3 cards, then returns the flop
-        if not self.deck.deal(3):
+        if not self.deck.burn(3):
             return False
         return self.deck.deal(3)
 
@@ -67,29 +92,26 @@ class Poker:
         :return: one card from the deck
         """
         # Burns 1 card, then returns the flop
-        if not self.deck.deal(1):
+        if not self.deck.burn(1):
             return False
         return self.deck.deal(1)
 
     def distribute(self):
         """
         Deals cards out to each player.
-        :return: a lists of all the hands, which is a list of cards
+        :return: a lists of all the hands, which is a list of card codes
         """
         # Each player gets 2 cards when playing by Texas Hold Em rules
         number_of_cards = 2
         if number_of_cards * self.number_of_players > self.deck.cards_left():
             return False
 
+        # Deals each player one card at a time, as in real life, by
+        # dealing every card at once and taking every player's share
+        cards = self.deck.deal(number_of_cards * self.number_of_players)
         inplay = []
         for i in range(0, self.number_of_players):
-            inplay.append([])
-
-        # Deals each player one card at a time
-        # Has greater complexity, but simulates real life better
-        for i in range(0, number_of_cards):
-            for j in range(0, self.number_of_players):
-                inplay[j].append(self.deck.deal(1).pop())
+            inplay.append(cards[i::self.number_of_players])
 
         # Returns a lists of all the hands, which is a list of cards
         return inplay
@@ -124,17 +146,48 @@ class Poker:
         else:
             return "Royal Flush"
 
+    def score(self, hand):
+        """
+        Checks the score of a hand using the selected evaluator.
+        The table evaluator always reports the full kickers of the best
+        five cards, where the legacy one drops some on short hands.
+        :param hand: The sorted card codes of the hand to be checked
+        :return: the score, and the kicker to be used in the event of a tie
+        """
+        if self.evaluator == "table":
+            score_function = evaluator.score
+        else:
+            score_function = self.legacy_score
+        if self.cache is not None:
+            return self.cache.score(hand, score_function,
+                                    self.evaluator)
+        return score_function(hand)
+
+    @staticmethod
+    def score_batch(hands_array):
+        """
+        Scores many hands in one vectorized call. Needs numpy installed.
+        :param hands_array: an (N, 7) integer array of card codes
+        :return: an array of the N scores and an array of the N ranks,
+                 where a higher rank is a better hand
+        """
+        return evaluator.score_batch(hands_array)
+
     @staticmethod
-    def score(hand):
+    def legacy_score(hand):
         """
         Checks the score of a hand. The higher the score, the better the hand.
-        :param hand: The hand to be checked
+        :param hand: The sorted card codes of the hand to be checked
         :return: the score, and the kicker to be used in the event of a tie
         """
 
         score = 0
         kicker = []
 
+        # Unpacks the card codes once, see deck.encode for the layout
+        values = [(card >> 2) + 2 for card in hand]
+        symbols = [card & 3 for card in hand]
+
         # ------------------------------------------------
         # -------------Checking for Pairs-----------------
         # ------------------------------------------------
@@ -144,14 +197,14 @@ class Poker:
         ''' Keeps track of all the pairs in a dictionary where 
         the key is the pair's card value and the value is the 
         number occurrences. Eg. If there are 3 Kings -> {"13":3} '''
-        for card in hand:
-            if prev == card.value:
-                key = card.value
+        for value in values:
+            if prev == value:
+                key = value
                 if key in pairs:
                     pairs[key] += 1
                 else:
                     pairs[key] = 2
-            prev = card.value
+            prev = value
 
         '''Keeps track of the number of pairs and sets. 
         The value of the previous dictionary is the key. 
@@ -176,7 +229,7 @@ class Poker:
 
             # Gets a list of all the cards remaining
             # once the the 4 of a kind is removed
-            temp = [card.value for card in hand if card.value != key]
+            temp = [value for value in values if value != key]
             # Gets the last card in the list which
             # is the highest remaining card to be used in
             # the event of a tie
@@ -224,7 +277,7 @@ class Poker:
 
                 # Gets a list of all the cards remaining
                 # once the three of a kind is removed
-                temp = [card.value for card in hand if card.value != key]
+                temp = [value for value in values if value != key]
 
                 # Get the 2 last cards in the list which
                 # are the 2 highest to be used in the event of a tie
@@ -252,8 +305,8 @@ class Poker:
 
                 # Gets a list of all the cards remaining
                 # once the the 2 pairs are removed
-                temp = [card.value for card in hand if
-                        card.value != key1 and card.value != key2]
+                temp = [value for value in values if
+                        value != key1 and value != key2]
 
                 # Gets the last card in the list which is
                 # the highest remaining card to be used in the event of a tie
@@ -268,7 +321,7 @@ class Poker:
                 key = kicker[0]
 
                 # Gets a list of all the cards remaining once pair are removed
-                temp = [card.value for card in hand if card.value != key]
+                temp = [value for value in values if value != key]
 
                 if len(temp) > 2:
                     # Gets the last 3 cards in the list which are the
@@ -294,7 +347,7 @@ class Poker:
         # Checks to see if the hand contains an ace,
         # and if so starts checking for the straight
         # using an ace low
-        if hand[len(hand) - 1].value == 14:
+        if values[len(values) - 1] == 14:
             prev = 1
         else:
             prev = None
@@ -304,18 +357,18 @@ class Poker:
          cards found in a row 
          ***It ignores pairs by skipping over cards that are similar to 
          the previous one*** '''
-        for card in hand:
-            if prev and card.value == (prev + 1):
+        for value in values:
+            if prev and value == (prev + 1):
                 counter += 1
                 if counter == 4:  # A straight has been recognized
                     straight = True
-                    high = card.value
+                    high = value
             # ignores pairs when checking for the straight
-            elif prev and prev == card.value:
+            elif prev and prev == value:
                 pass
             else:
                 counter = 0
-            prev = card.value
+            prev = value
 
         # If a straight has been realized and the hand
         # has a lower score than a straight
@@ -335,8 +388,7 @@ class Poker:
         ''' Loops through the hand calculating the number of cards of each 
         symbol. The symbol value is the key and for every occurrence the
         counter is incremented'''
-        for card in hand:
-            key = card.symbol
+        for key in symbols:
             if key in total:
                 total[key] += 1
             else:
@@ -353,7 +405,8 @@ class Poker:
         if key != -1 and score < 5:
             flush = True
             score = 5
-            kicker = [card.value for card in hand if card.symbol == key]
+            kicker = [values[i] for i in range(len(hand))
+                      if symbols[i] == key]
 
         # ------------------------------------------------
         # -----Checking for Straight & Royal Flush--------
@@ -417,7 +470,7 @@ class Poker:
         if score == 0:
 
             # It will keep track of only the card's value
-            kicker = [int(card.value) for card in hand]
+            kicker = list(values)
             # Reverses the list for easy comparison in the event of a tie
             kicker.reverse()
             # Since the hand is sorted it will pop the two lowest
@@ -442,14 +495,13 @@ class Poker:
         :return: the list of scores for each player
         """
 
-        for hand in players_hands:
-            hand.extend(community_cards)
-            hand.sort(key=lambda x: x.value)
+        # Scores copies so the players' hands are left as they were dealt
+        full_hands = [sorted(hand + community_cards) for hand in players_hands]
 
         results = []
         if self.debug:  # Outputs the debug statements
             print("---- Determining Scores----")
-        for hand in players_hands:
+        for hand in full_hands:
 
             overall = self.score(hand)
             results.append([overall[0], overall[1]])  # Stores the results
@@ -457,7 +509,7 @@ class Poker:
             if self.debug:  # Outputs the debug statements
                 text = "Hand -- "
                 for c in hand:
-                    text += str(c) + "  "
+                    text += str(to_card(c)) + "  "
 
                 kicker = ""
                 for c in overall.pop(1):
@@ -543,17 +595,13 @@ class Poker:
     @staticmethod
     def convert_knowledge_to_dict(knowledge):
         """
-        Converts the string of data for the AI to a dictionary
+        Converts the string of data for the AI to a dictionary, indexed
+        for get_winning_odds by every prefix of the scores.
 
         :param knowledge: the string of data
         :return: a dictionary version of the passed in data
         """
-        my_dict = {}
-        s = StringIO(knowledge)
-        for line in s:
-            data = line.strip().split("|")
-            my_dict[data[0].strip()] = data[1]
-        return my_dict
+        return knowledge_base.parse_knowledge(knowledge)
 
     def get_winning_odds(self, scores_to_compare, knowledge):
         """
@@ -564,9 +612,17 @@ class Poker:
         :param knowledge: The data of previous games played
         :return: the odds of winning at the current phase of the game
         """
+        scores = str(scores_to_compare).split(",")
+        if hasattr(knowledge, "odds"):
+            # Indexed knowledge already holds the odds of every prefix
+            odds = knowledge.odds(tuple(int(score) for score in scores))
+            if odds is None:
+                print("I'm not sure how this happened!"
+                      "  New data point, possibly?")
+            return odds
+
         odds = 0
         total = 0
-        scores = str(scores_to_compare).split(",")
         for data, percentage in knowledge.items():
             phases = data.split(",")  # Splits something like 0, 0, 1, 3, 0
 
@@ -582,6 +638,24 @@ class Poker:
             # winning at this current phase of the game.
             return odds/total
 
+    @staticmethod
+    def get_sampled_odds(hand, community_cards, executor=None,
+                         tolerance=0.02):
+        """
+        Estimates the odds of winning by sampling runouts across a process
+        pool, instead of looking them up from previous games played.
+
+        :param hand: the AI's hand
+        :param community_cards: the community cards dealt so far
+        :param executor: the process pool to sample on
+        :param tolerance: the widest the 95% confidence interval may be
+        :return: the odds of winning at the current phase of the game
+        """
+        result = equity.monte_carlo_equity(hand, community_cards,
+                                           tolerance=tolerance,
+                                           executor=executor)
+        return result["equity"]
+
     @staticmethod
     def compare_records(record_one, record_two):
         """
@@ -621,7 +695,9 @@ class Poker:
     def bidding(self, dealer, player_statuses, highest_bid,
                 ai_odds, phase_number):
         """
-        Handles the bidding logic for the poker game
+        Handles the bidding logic for the poker game, asking the human
+        players for their actions at the keyboard. The turns are kept by
+        a BettingRound, see betting.py.
 
         :param dealer: the id of the dealer
         :param player_statuses: the current status
@@ -633,164 +709,85 @@ class Poker:
         """
 
         # NOTE: Throughout this, Player 0 will be the AI.
-        i = dealer
-        all_turns = False  # Will keep track if everyone got at least one turn.
-        bid_status = False  # Will keep track if all bids are in.
-        end_now = False # Will keep track if the human calls the AIs raise
-
-        # Will keep track of what the highest of the
-        # previous round was (for ref).
-        prev_round_highest = highest_bid
-
-        # Ratio used to determine how valuable our ai_odds are.
-        # *TWEEK THESE FOR BETTER AI*
-        ratio = 2 / 5
-        if phase_number == 0:
-            ratio = 2/5
-        elif phase_number == 1:
-            if ai_odds >= 80:
-                ratio = 5/5
-            else:
-                ratio = 3/5
-        elif phase_number == 2:
-            if ai_odds >= 80:
-                ratio = 6/5
-            else:
-                ratio = 2/5
-        elif phase_number == 3:
-            if ai_odds >= 85:
-                ratio = 7/5
-            else:
-                ratio = 1/5
+        players = range(len(player_statuses))
+        bids = [player_statuses[player][0] for player in players]
+        statuses = [player_statuses[player][1] for player in players]
+        betting = BettingRound(bids, statuses, (dealer + 1) % len(players),
+                               highest_bid=highest_bid)
 
         # The upper-bound is the "limit" at which we begin
         # to fold (if past phase 0).
-        upper_bound = int(ratio*ai_odds)*2
-        while True:
-            j = (i + 1) % len(player_statuses)
-            # If you're still playing this round..
-            if player_statuses.get(j)[1] != "fold":
-                print("PLAYER " + str(j) + "'s TURN")
-                if player_statuses.get(j)[0] < highest_bid:
-                    if j != 0:  # Make sure it isn't the AI (who is player 0).
-                        action = input(
-                            "Highest bid is currently " + str(highest_bid)
-                            + ".  Please type fold, call, raise.\n")
-                    else:
-                        action = \
-                            self.decision_tree(highest_bid,
-                                               prev_round_highest,
-                                               player_statuses.get(j)[0],
-                                               upper_bound,
-                                               phase_number)[0]
-                        print("ACTION! " + action)
-                    if self.check_action(action):
-                        if action.strip().lower() == "raise":
-                            if j != 0:
-                                new_value = input("Please enter the numerical "
-                                                  "amount you'd like to "
-                                                  "raise by.\n")
-                                try:
-                                    highest_bid += int(new_value)
-                                except ValueError:
-                                    print("Not a valid number.")
-                                    j -= 1
-                            else:
-                                new_value = \
-                                    self.decision_tree(highest_bid,
-                                                       prev_round_highest,
-                                                       player_statuses.get(j)
-                                                       [0],
-                                                       upper_bound,
-                                                       phase_number)[1]
-                                highest_bid += new_value
-                                print("By: " + str(new_value))
-                            player_statuses.get(j)[0] = highest_bid
-                            player_statuses.get(j)[1] = "raise"
-                        elif action.strip().lower() == "fold":
-                            player_statuses.get(j)[1] = "fold"
-                            end_now = True
-                        else:
-                            player_statuses.get(j)[0] = highest_bid
-                            player_statuses.get(j)[1] = "call"
-                            end_now = True
-                    else:
-                        # They entered an invalid command.
-                        # I'm not really error checking,
-                        # cause' who's got time for that.
-                        print("Invalid answer.")
-                        player_statuses.get(j)[1] = "error"
-                        j -= 1
+        upper_bound = self.upper_bound(ai_odds, phase_number)
+        while not betting.done:
+            j = betting.player
+            print("PLAYER " + str(j) + "'s TURN")
+            if j != 0:  # Make sure it isn't the AI (who is player 0).
+                action, amount = self.ask_action(betting)
+            else:
+                decision = self.decision_tree(betting.highest_bid,
+                                              betting.prev_round_highest,
+                                              bids[j], upper_bound,
+                                              phase_number)
+                action = decision[0]
+                amount = decision[1] if action == "raise" else 0
+                print("ACTION! " + action)
+                if action == "raise":
+                    print("By: " + str(amount))
+            betting.act(action, amount)
 
-                else:
-                    if j != 0:
-                        action = input("You're currently matched "
-                                       "with the highest bids ("
-                                       + str(highest_bid)
-                                       + ").  "
-                                         "Would you like to fold, "
-                                         "hold, or raise?\n")
-                    else:
-                        action = \
-                            self.decision_tree(highest_bid, prev_round_highest,
-                                               player_statuses.get(j)[0],
-                                               upper_bound,
-                                               phase_number)[0]
-                        print("ACTION! " + action)
-                    if self.check_action(action):
-                        if action.strip().lower() == "raise":
-                            if j != 0:
-                                new_value = input("Please enter the numerical "
-                                                  "amount you'd like to "
-                                                  "raise by.\n")
-                                try:
-                                    highest_bid += int(new_value)
-                                except ValueError:
-                                    print("Not a valid number.")
-                                    j -= 1
-                            else:
-                                new_value = \
-                                    self.decision_tree(highest_bid,
-                                                       prev_round_highest,
-                                                       player_statuses.get(j)
-                                                       [0],
-                                                       upper_bound,
-                                                       phase_number)[1]
-                                highest_bid += new_value
-                                print("By: " + str(new_value))
-                            player_statuses.get(j)[0] = highest_bid
-                            player_statuses.get(j)[1] = "raise"
-                        elif action.strip().lower() == "fold":
-                            player_statuses.get(j)[1] = "fold"
-                        else:
-                            player_statuses.get(j)[1] = "hold"
-                    else:
-                        # They entered an invalid command.
-                        print("Invalid answer.")
-                        player_statuses.get(j)[1] = "error"
-                        j -= 1
+        for player in players:
+            player_statuses[player][0] = bids[player]
+            player_statuses[player][1] = statuses[player]
+        return betting.highest_bid
 
+    def ask_action(self, betting):
+        """
+        Asks the human player to act until they enter a valid action.
+
+        :param betting: the BettingRound being played
+        :return: the action, and the amount to raise by
+        """
+        while True:
+            if betting.to_call:
+                action = input("Highest bid is currently "
+                               + str(betting.highest_bid)
+                               + ".  Please type fold, call, raise.\n")
             else:
-                end_now = True
-            k = 0
-            for player in player_statuses:
-                if player_statuses[player][1] != "fold" \
-                        and player_statuses[player][1] != "hold":
-
-                    bid_status = False
-                    break
-                k += 1
-            if k == len(player_statuses):
-                bid_status = True
-            if not all_turns and j == dealer:
-                all_turns = True
-
-            # Check to see if everyone's gotten a chance, and bids are matched.
-            if not all_turns or not end_now:
-                i = j
-            else:
-                break
-        return highest_bid
+                action = input("You're currently matched "
+                               "with the highest bids ("
+                               + str(betting.highest_bid)
+                               + ").  "
+                                 "Would you like to fold, "
+                                 "hold, or raise?\n")
+            if not self.check_action(action):
+                # They entered an invalid command.
+                print("Invalid answer.")
+                continue
+            if action.strip().lower() != "raise":
+                return action, 0
+            new_value = input("Please enter the numerical "
+                              "amount you'd like to "
+                              "raise by.\n")
+            try:
+                return action, int(new_value)
+            except ValueError:
+                print("Not a valid number.")
+
+    @classmethod
+    def upper_bound(cls, ai_odds, phase_number, ratios=None):
+        """
+        Works out the "limit" at which the AI begins to fold.
+
+        :param ai_odds: the calculated odds of the AI winning, 0 through 100
+        :param phase_number: which phase the game is currently in
+        :param ratios: the ratios of each phase, PHASE_RATIOS by default
+        :return: the upper bound of the AI's bids this phase
+        """
+        threshold, strong_ratio, ratio = (ratios or cls.PHASE_RATIOS)[
+            phase_number]
+        if ai_odds >= threshold:
+            ratio = strong_ratio
+        return int(ratio*ai_odds)*2
 
     @staticmethod
     def decision_tree(highest_bid, prev_round_highest, my_highest_bid,
@@ -885,7 +882,7 @@ class Poker:
         for hand in players_hands:
             text = "Player " + str(i) + " - "
             for card in hand:
-                text += str(card) + "  "
+                text += str(to_card(card)) + "  "
             if i != 0 or editor_mode:
                 print(text)
             i += 1
@@ -0,0 +1,862 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import uuid
+from multiprocessing import resource_tracker, shared_memory
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed by odds_batch
+    numpy = None
+
+""" Knowledge Aggregation.
+This module turns the records written by createdata.py into the knowledge
+the AI plays with.
+
+A record holds the scores of a player's hand at each phase, the score of the
+community cards alone, and a 1 or 0 for a win or a loss:
+
+    s0, s1, s2, s3, s4, win
+
+A line of knowledge is keyed the same way main.py keys the AI's scores, with
+the last score being a 1 when the hand is no better than the community cards:
+
+    s0, s1, s2, s3, flag | percentage | wins | total
+
+The win and total counts let new records be merged into existing knowledge.
+Lines holding only a percentage are still read, but can't be merged into.
+
+Records are streamed a line at a time, so the memory used only grows with
+the number of distinct keys, not with the number of records.
+
+Loaded knowledge is held in a KnowledgeBase, which indexes the odds of every
+prefix of every key. Looking up the odds of the AI's scores so far is then a
+single dictionary lookup, however much knowledge has been gathered.
+
+Knowledge can also be compiled into a binary snapshot, which a bot memory
+maps instead of parsing. It holds the same prefix index, laid out as:
+
+    header      magic, version, key width, number of prefixes
+    keys        sorted 8 byte keys, the prefix length then its scores
+    sums        float64 weighted sum of the percentages of each prefix
+    weights     float64 total weight of each prefix
+
+A snapshot can also be put in shared memory by one loader, with every worker
+process on the host attaching to the same read only copy.
+
+A KnowledgeProvider watches a knowledge file and its snapshot, and reloads
+them in the background whenever they change.
+
+The outcome of every game a bot plays is appended to an outcome log in the
+record format, and counted straight into the bot's KnowledgeBase. From time
+to time the log is compacted, merging its records into the knowledge file.
+Each log starts with a token of its own, which the knowledge file it is
+merged into holds on its first line:
+
+    # compacted <token>
+
+so a compaction stopped after the merge never counts the same log twice.
+
+Usage:
+    python knowledge.py <knowledge file> <record file>... [--merge]
+    python knowledge.py <knowledge file> [--compile] [--share]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+
+class KnowledgeBase(dict):
+    """
+    Dictionary of the percentage of each line of knowledge, keyed by
+    its scores, along with an index of the odds of every prefix of scores
+    """
+
+    def __init__(self):
+        """
+        Constructor for the KnowledgeBase class.
+        """
+        super().__init__()
+        # The [weighted sum of percentages, total weight] of every prefix
+        self.prefixes = {}
+        # The (weighted percentage, weight) each line added to its prefixes
+        self.weights = {}
+
+    def add(self, key, percentage, wins=None, total=None):
+        """
+        Adds a line of knowledge and indexes every prefix of its scores.
+        Lines with counts are weighted by their total, lines without
+        counts are given a weight of one.
+
+        :param key: the scores of the line, such as "0, 1, 1, 3, 0"
+        :param percentage: the percentage of games won, as a string
+        :param wins: the number of games won, if known
+        :param total: the number of games played, if known
+        """
+        scores = tuple(int(score) for score in key.split(","))
+        if total:
+            weight = total
+            value = float(wins)
+        else:
+            weight = 1
+            value = float(percentage)
+        if key in self:
+            # A line seen again replaces the earlier one
+            old_value, old_weight = self.weights[key]
+            value -= old_value
+            weight -= old_weight
+        else:
+            self.weights[key] = (0.0, 0)
+        self[key] = percentage
+        old_value, old_weight = self.weights[key]
+        self.weights[key] = (old_value + value, old_weight + weight)
+
+        for length in range(1, len(scores) + 1):
+            prefix = self.prefixes.setdefault(scores[:length], [0.0, 0])
+            prefix[0] += value
+            prefix[1] += weight
+
+    def record(self, key, win):
+        """
+        Counts the outcome of one more game into a line of knowledge,
+        updating only the line and its prefixes.
+
+        :param key: the scores of the line, such as "0, 1, 1, 3, 0"
+        :param win: 1 if the game was won, 0 if it was lost
+        """
+        old_value, old_weight = self.weights.get(key, (0.0, 0))
+        value = old_value + win
+        weight = old_weight + 1
+        self.weights[key] = (value, weight)
+        self[key] = "{:.4f}".format(value / weight)
+
+        scores = tuple(int(score) for score in key.split(","))
+        for length in range(1, len(scores) + 1):
+            prefix = self.prefixes.setdefault(scores[:length], [0.0, 0])
+            prefix[0] += win
+            prefix[1] += 1
+
+    def odds(self, scores):
+        """
+        Gets the weighted average odds of every line starting with scores.
+
+        :param scores: a tuple of the scores so far
+        :return: the odds of winning, or None if no line starts with scores
+        """
+        prefix = self.prefixes.get(scores)
+        if prefix is None:
+            return None
+        return prefix[0] / prefix[1]
+
+
+# Layout of a compiled snapshot
+SNAPSHOT_MAGIC = b"KNWB"
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct("<4sHHI")
+KEY_SIZE = 8
+DOUBLE = struct.Struct("<d")
+
+
+def pack_key(scores):
+    """
+    Packs a prefix of scores into a snapshot key. Keys sort the same way
+    as their bytes, so the snapshot can be searched in place.
+
+    :param scores: a tuple of scores, each 0 through 255
+    :return: the 8 byte key
+    """
+    return bytes((len(scores),) + scores).ljust(KEY_SIZE, b"\0")
+
+
+class KnowledgeSnapshot:
+    """
+    Class reading a compiled knowledge snapshot in place from a buffer,
+    such as a memory mapped file
+    """
+
+    def __init__(self, buffer, source=None):
+        """
+        Constructor for the KnowledgeSnapshot class.
+
+        :param buffer: the bytes of the snapshot
+        :param source: an object to keep open for as long as the snapshot,
+                       such as the memory map the buffer comes from
+        """
+        self.buffer = buffer
+        self.source = source
+        if len(buffer) < SNAPSHOT_HEADER.size:
+            raise ValueError("Not a knowledge snapshot.")
+        magic, version, self.width, self.count = \
+            SNAPSHOT_HEADER.unpack_from(buffer)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise ValueError("Not a knowledge snapshot.")
+        if len(buffer) < SNAPSHOT_HEADER.size \
+                + self.count * (KEY_SIZE + 2 * DOUBLE.size):
+            raise ValueError("The knowledge snapshot is cut short.")
+        self.keys_offset = SNAPSHOT_HEADER.size
+        self.sums_offset = self.keys_offset + self.count * KEY_SIZE
+        self.weights_offset = self.sums_offset + self.count * DOUBLE.size
+
+    def find(self, scores):
+        """
+        Binary searches the keys for a prefix of scores.
+
+        :param scores: a tuple of the scores so far
+        :return: the position of the prefix, or -1 if it isn't held
+        """
+        if len(scores) > self.width or max(scores, default=0) > 255 \
+                or min(scores, default=0) < 0:
+            return -1
+        key = pack_key(scores)
+        low = 0
+        high = self.count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self.keys_offset + middle * KEY_SIZE
+            found = bytes(self.buffer[offset:offset + KEY_SIZE])
+            if found < key:
+                low = middle + 1
+            elif found > key:
+                high = middle
+            else:
+                return middle
+        return -1
+
+    def odds(self, scores):
+        """
+        Gets the weighted average odds of every line starting with scores.
+
+        :param scores: a tuple of the scores so far
+        :return: the odds of winning, or None if no line starts with scores
+        """
+        position = self.find(scores)
+        if position < 0:
+            return None
+        total = DOUBLE.unpack_from(self.buffer, self.sums_offset
+                                   + position * DOUBLE.size)[0]
+        weight = DOUBLE.unpack_from(self.buffer, self.weights_offset
+                                    + position * DOUBLE.size)[0]
+        return total / weight
+
+    def odds_batch(self, scores_list):
+        """
+        Gets the odds of many sets of scores at once, searching the keys
+        for all of them in one go with numpy.
+
+        :param scores_list: a list of tuples of the scores so far
+        :return: a list of the odds of each, or None where no line starts
+                 with the scores
+        """
+        if numpy is None:
+            return [self.odds(scores) for scores in scores_list]
+        odds = [None] * len(scores_list)
+        # Scores that can't be packed are never held
+        held = [i for i, scores in enumerate(scores_list)
+                if len(scores) <= self.width
+                and 0 <= min(scores, default=0)
+                and max(scores, default=0) <= 255]
+        if not held or not self.count:
+            return odds
+        # Keys sort the same as big endian integers
+        keys = numpy.frombuffer(self.buffer, ">u8", self.count,
+                                self.keys_offset)
+        wanted = numpy.frombuffer(b"".join(pack_key(scores_list[i])
+                                           for i in held), ">u8")
+        positions = numpy.minimum(numpy.searchsorted(keys, wanted),
+                                  self.count - 1)
+        found = keys[positions] == wanted
+        sums = numpy.frombuffer(self.buffer, "<f8", self.count,
+                                self.sums_offset)[positions]
+        weights = numpy.frombuffer(self.buffer, "<f8", self.count,
+                                   self.weights_offset)[positions]
+        for i, hit, total, weight in zip(held, found.tolist(), sums.tolist(),
+                                         weights.tolist()):
+            if hit:
+                odds[i] = total / weight
+        return odds
+
+    def close(self):
+        """
+        Releases the buffer of the snapshot.
+        """
+        if isinstance(self.buffer, memoryview):
+            self.buffer.release()
+        self.buffer = None
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+
+
+def snapshot_bytes(knowledge_base):
+    """
+    Compiles the prefix index of some knowledge into a snapshot.
+
+    :param knowledge_base: the KnowledgeBase to compile
+    :return: the bytes of the snapshot
+    """
+    prefixes = sorted(knowledge_base.prefixes.items(),
+                      key=lambda item: pack_key(item[0]))
+    width = max([len(scores) for scores, value in prefixes], default=0)
+    if width > KEY_SIZE - 1:
+        raise ValueError("Knowledge keys are too long to compile.")
+
+    parts = [SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION,
+                                  width, len(prefixes))]
+    parts.extend(pack_key(scores) for scores, value in prefixes)
+    parts.extend(DOUBLE.pack(value[0]) for scores, value in prefixes)
+    parts.extend(DOUBLE.pack(value[1]) for scores, value in prefixes)
+    return b"".join(parts)
+
+
+def compile_snapshot(knowledge_base, path):
+    """
+    Writes the prefix index of some knowledge to a snapshot file.
+    The file is replaced in one step, so it is never read half written.
+
+    :param knowledge_base: the KnowledgeBase to compile
+    :param path: the snapshot file to write
+    """
+    temp_path = path + ".tmp"
+    with open(temp_path, "wb") as file:
+        file.write(snapshot_bytes(knowledge_base))
+    os.replace(temp_path, path)
+
+
+class SharedKnowledge:
+    """
+    Class owning a knowledge snapshot placed in shared memory,
+    which worker processes attach to by name
+    """
+
+    def __init__(self, knowledge_base):
+        """
+        Constructor for the SharedKnowledge class. Copies the snapshot
+        into a new block of shared memory.
+
+        :param knowledge_base: the KnowledgeBase to share
+        """
+        data = snapshot_bytes(knowledge_base)
+        self.memory = shared_memory.SharedMemory(create=True, size=len(data))
+        self.memory.buf[:len(data)] = data
+        self.name = self.memory.name
+
+    def close(self):
+        """
+        Frees the shared memory. Workers should detach first.
+        """
+        self.memory.close()
+        self.memory.unlink()
+
+
+def attach_knowledge(name):
+    """
+    Attaches to knowledge shared by another process. Nothing is copied,
+    every process reads the same memory.
+
+    :param name: the name of the SharedKnowledge
+    :return: a read only KnowledgeSnapshot of the shared memory
+    """
+    try:
+        # Only the process that shared the memory may free it
+        memory = shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        memory = shared_memory.SharedMemory(name=name)
+        # Python before 3.13 always tracks it, and would free it as soon
+        # as this process exits
+        resource_tracker.unregister(memory._name, "shared_memory")
+    view = memory.buf.toreadonly()
+    try:
+        return KnowledgeSnapshot(view, memory)
+    except ValueError:
+        view.release()
+        memory.close()
+        raise
+
+
+def snapshot_path(path):
+    """
+    Gets where the snapshot of a knowledge file is compiled to.
+
+    :param path: the knowledge file
+    :return: the path of its snapshot
+    """
+    return os.path.splitext(path)[0] + ".knb"
+
+
+def open_snapshot(path):
+    """
+    Memory maps a snapshot file.
+
+    :param path: the snapshot file
+    :return: a KnowledgeSnapshot reading the file in place
+    """
+    with open(path, "rb") as file:
+        source = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        return KnowledgeSnapshot(source, source)
+    except ValueError:
+        source.close()
+        raise
+
+
+def is_snapshot(path):
+    """
+    Checks whether a file is a compiled snapshot.
+
+    :param path: the file to check
+    :return: True if the file starts like a snapshot; False if otherwise
+    """
+    with open(path, "rb") as file:
+        return file.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+def text_knowledge_path(path):
+    """
+    Gets the text knowledge file that records can be merged into. A
+    snapshot's is the text file it was compiled from, next to it.
+
+    :param path: the knowledge file, or its snapshot
+    :return: the path of the text knowledge file
+    """
+    if path.startswith("shm:"):
+        raise ValueError("Shared knowledge has no file to merge into.")
+    if not os.path.exists(path) or not is_snapshot(path):
+        return path
+    text_path = os.path.splitext(path)[0] + ".txt"
+    if not os.path.exists(text_path) or is_snapshot(text_path):
+        raise ValueError("No text knowledge file " + text_path
+                         + " to merge into.")
+    return text_path
+
+
+def load_knowledge(path):
+    """
+    Loads knowledge for the AI to play with. A snapshot is memory mapped
+    when path is one, or when the knowledge file has an up to date
+    snapshot compiled next to it. Otherwise the text is parsed.
+
+    :param path: the knowledge file, or its snapshot, or "shm:" followed
+                 by the name of shared knowledge to attach to
+    :return: a KnowledgeSnapshot or a KnowledgeBase of the knowledge
+    """
+    if path.startswith("shm:"):
+        return attach_knowledge(path[len("shm:"):])
+    if is_snapshot(path):
+        return open_snapshot(path)
+    compiled = snapshot_path(path)
+    if os.path.exists(compiled) \
+            and os.path.getmtime(compiled) >= os.path.getmtime(path):
+        return open_snapshot(compiled)
+    with open(path) as file:
+        return parse_knowledge(file.read())
+
+
+class KnowledgeProvider:
+    """
+    Class holding the latest knowledge of a file, which a background thread
+    reloads whenever the file or its snapshot changes
+    """
+
+    def __init__(self, path, interval=1.0):
+        """
+        Constructor for the KnowledgeProvider class. Loads the knowledge
+        and starts watching the file.
+
+        :param path: the knowledge file, or its snapshot
+        :param interval: seconds between checks of the file
+        """
+        self.path = path
+        self.interval = interval
+        self.stamp = self.file_stamp()
+        # Swapped as one tuple, so readers never see a half loaded table
+        self.state = (load_knowledge(path), 1)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.watch, daemon=True)
+        self.thread.start()
+
+    def file_stamp(self):
+        """
+        Gets the modification time and size of the file and its snapshot.
+
+        :return: a tuple that changes whenever either file changes
+        """
+        stamp = []
+        for path in (self.path, snapshot_path(self.path)):
+            try:
+                status = os.stat(path)
+                stamp.append((status.st_mtime_ns, status.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def current(self):
+        """
+        Gets the latest knowledge. Take it once per hand, so every decision
+        of a hand is made with the same knowledge.
+
+        :return: the knowledge, and its generation number, which goes up
+                 by one with every reload
+        """
+        return self.state
+
+    def reload(self):
+        """
+        Loads the knowledge again and swaps it in.
+
+        :return: True if the knowledge was swapped; False if it failed
+                 to load, in which case the old knowledge is kept
+        """
+        stamp = self.file_stamp()
+        try:
+            knowledge = load_knowledge(self.path)
+        except Exception:
+            return False  # Tried again once the file next changes
+        self.stamp = stamp
+        self.state = (knowledge, self.state[1] + 1)
+        return True
+
+    def watch(self):
+        """
+        Checks the file for changes until stop is called.
+        """
+        seen = self.stamp
+        while not self.stopped.wait(self.interval):
+            stamp = self.file_stamp()
+            # Only reloaded once the file has stopped changing for an
+            # interval, so one being written in place isn't read half done
+            if stamp == seen and stamp != self.stamp:
+                self.reload()
+            seen = stamp
+
+    def stop(self):
+        """
+        Stops watching the file.
+        """
+        self.stopped.set()
+        self.thread.join()
+
+
+def parse_knowledge(knowledge):
+    """
+    Parses the text of a knowledge file.
+
+    :param knowledge: the string of data
+    :return: a KnowledgeBase of the data
+    """
+    knowledge_base = KnowledgeBase()
+    for line in knowledge.splitlines():
+        data = line.strip().split("|")
+        if len(data) < 2:
+            continue
+        if len(data) >= 4:
+            knowledge_base.add(data[0].strip(), data[1],
+                               int(data[2]), int(data[3]))
+        else:
+            knowledge_base.add(data[0].strip(), data[1])
+    return knowledge_base
+
+
+def record_key(record):
+    """
+    Gets the knowledge key of a record.
+
+    :param record: a line of a record file
+    :return: the key of the record and whether it was a win,
+             or None if the line is not a record
+    """
+    scores = record.split(",")
+    if len(scores) != 6:
+        return None
+    scores = [int(score) for score in scores]
+    # Flags the hands that are no better than the community cards alone
+    flag = 1 if scores[3] == scores[4] else 0
+    key = ", ".join(str(score) for score in scores[:4]) + ", " + str(flag)
+    return key, scores[5]
+
+
+def aggregate_records(paths, counts=None):
+    """
+    Counts the wins and totals of every key in some record files.
+
+    :param paths: the record files to read
+    :param counts: the counts to add to, keyed by knowledge key
+    :return: a dictionary of [wins, total] keyed by knowledge key
+    """
+    if counts is None:
+        counts = {}
+    for path in paths:
+        with open(path) as file:
+            for line in file:
+                record = record_key(line)
+                if record is None:
+                    continue
+                key, win = record
+                count = counts.get(key)
+                if count is None:
+                    counts[key] = [win, 1]
+                else:
+                    count[0] += win
+                    count[1] += 1
+    return counts
+
+
+def read_knowledge(path):
+    """
+    Reads the counts held in a knowledge file.
+
+    :param path: the knowledge file to read
+    :return: a dictionary of [wins, total] keyed by knowledge key, and a
+             dictionary of the percentages of lines without counts
+    """
+    counts = {}
+    percentages = {}
+    with open(path) as file:
+        for line in file:
+            data = line.strip().split("|")
+            if len(data) < 2:
+                continue
+            key = data[0].strip()
+            if len(data) >= 4:
+                counts[key] = [int(data[2]), int(data[3])]
+            else:
+                percentages[key] = data[1].strip()
+    return counts, percentages
+
+
+def sort_key(key):
+    """
+    Orders knowledge keys by their scores.
+
+    :param key: the knowledge key
+    :return: the scores of the key, last phase first
+    """
+    return [int(score) for score in reversed(key.split(","))]
+
+
+def write_knowledge(path, counts, percentages=None, marker=None):
+    """
+    Writes knowledge to a file. The file is replaced in one step, so a bot
+    reading it never sees it half written.
+
+    :param path: the knowledge file to write
+    :param counts: a dictionary of [wins, total] keyed by knowledge key
+    :param percentages: percentages of keys without counts to carry over
+    :param marker: the token of the outcome log merged in, if any
+    """
+    lines = {}
+    for key, percentage in (percentages or {}).items():
+        if key not in counts:
+            lines[key] = key + " | " + percentage + "\n"
+    for key, (wins, total) in counts.items():
+        lines[key] = "{} | {:.4f} | {} | {}\n".format(key, wins / total,
+                                                      wins, total)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as file:
+        if marker is not None:
+            file.write(MARKER + marker + "\n")
+        for key in sorted(lines, key=sort_key):
+            file.write(lines[key])
+    os.replace(temp_path, path)
+
+
+def aggregate(knowledge_path, record_paths, merge=False, marker=None):
+    """
+    Aggregates record files into a knowledge file.
+
+    :param knowledge_path: the knowledge file to write
+    :param record_paths: the record files to read
+    :param merge: whether or not to add to the counts already held in the
+                  knowledge file, instead of replacing them
+    :param marker: the token of the outcome log being merged, if any
+    :return: the number of keys written
+    """
+    counts = {}
+    percentages = {}
+    if merge and os.path.exists(knowledge_path):
+        counts, percentages = read_knowledge(knowledge_path)
+    aggregate_records(record_paths, counts)
+    write_knowledge(knowledge_path, counts, percentages, marker)
+    return len(counts) + len([key for key in percentages
+                              if key not in counts])
+
+
+# The first line of an outcome log, and of the knowledge it was merged into
+LOG_HEADER = "# log "
+MARKER = "# compacted "
+
+
+def first_line_token(path, prefix):
+    """
+    Gets the token on the first line of a file.
+
+    :param path: the file to read
+    :param prefix: what the line starts with before the token
+    :return: the token, or None if the file doesn't start with one
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        line = file.readline()
+    if not line.startswith(prefix):
+        return None
+    return line[len(prefix):].strip()
+
+
+class OutcomeLog:
+    """
+    Class appending the outcome of each game to a record file
+    """
+
+    def __init__(self, path):
+        """
+        Constructor for the OutcomeLog class. Opens the log for appending.
+
+        :param path: the record file to append to
+        """
+        self.path = path
+        self.file = None
+        self.open()
+
+    def open(self):
+        """
+        Opens the log for appending, starting it with a new token when
+        it is empty.
+        """
+        if os.path.exists(self.path) and os.path.getsize(self.path) \
+                and first_line_token(self.path, LOG_HEADER) is None:
+            # A log written before logs had tokens is given one
+            temp_path = self.path + ".tmp"
+            with open(temp_path, "w") as file, open(self.path) as log:
+                file.write(LOG_HEADER + uuid.uuid4().hex + "\n")
+                file.write(log.read())
+            os.replace(temp_path, self.path)
+        self.file = open(self.path, "a")
+        if self.file.tell() == 0:
+            self.file.write(LOG_HEADER + uuid.uuid4().hex + "\n")
+            self.file.flush()
+
+    def write(self, scores, board_score, win):
+        """
+        Appends the outcome of a game. The line is flushed straight away,
+        so it is kept even if the bot is stopped.
+
+        :param scores: the scores of the hand at phases zero through three
+        :param board_score: the score of the community cards alone
+        :param win: 1 if the game was won, 0 if it was lost
+        :return: the knowledge key of the record
+        """
+        record = ", ".join(str(score).strip() for score in scores) \
+            + ", " + str(board_score) + ", " + str(win)
+        self.file.write(record + "\n")
+        self.file.flush()
+        return record_key(record)[0]
+
+    def compact(self, knowledge_path):
+        """
+        Merges the logged records into the counts of a knowledge file,
+        then starts a new log. A snapshot is merged into through its text
+        file, and compiled again.
+
+        :param knowledge_path: the knowledge file, or its snapshot, to
+                               merge into
+        :return: the number of keys written
+        """
+        # Checked before anything is moved, so a bad path loses nothing
+        knowledge_path = text_knowledge_path(knowledge_path)
+        self.file.close()
+        # Moved aside first, so a compaction stopped part way is finished
+        # by the next one instead of losing the records
+        compacting = self.path + ".compacting"
+        keys = 0
+        if os.path.exists(compacting):
+            keys = self.merge(compacting, knowledge_path)
+        if os.path.exists(self.path):
+            os.replace(self.path, compacting)
+            keys = self.merge(compacting, knowledge_path)
+        compiled = snapshot_path(knowledge_path)
+        if os.path.exists(compiled) and os.path.exists(knowledge_path) \
+                and os.path.getmtime(compiled) \
+                < os.path.getmtime(knowledge_path):
+            with open(knowledge_path) as file:
+                compile_snapshot(parse_knowledge(file.read()), compiled)
+        self.open()
+        return keys
+
+    @staticmethod
+    def merge(compacting, knowledge_path):
+        """
+        Merges a log moved aside into a knowledge file, unless the knowledge
+        file shows it was already merged, then removes the log.
+
+        :param compacting: the log moved aside
+        :param knowledge_path: the knowledge file to merge into
+        :return: the number of keys written, or 0 if it was already merged
+        """
+        token = first_line_token(compacting, LOG_HEADER)
+        keys = 0
+        if token is None or token != first_line_token(knowledge_path, MARKER):
+            keys = aggregate(knowledge_path, [compacting], merge=True,
+                             marker=token)
+        os.remove(compacting)
+        return keys
+
+    def close(self):
+        """
+        Closes the log.
+        """
+        self.file.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Aggregates records into knowledge for the AI.")
+    parser.add_argument("knowledge", help="knowledge file to write")
+    parser.add_argument("records", nargs="*", help="record files to read")
+    parser.add_argument("--merge", action="store_true",
+                        help="add to the counts already in the knowledge file")
+    parser.add_argument("--compile", action="store_true",
+                        help="compile a snapshot of the knowledge file")
+    parser.add_argument("--share", action="store_true",
+                        help="hold the knowledge in shared memory until "
+                             "interrupted, for bots to attach to")
+    options = parser.parse_args()
+    if not options.records and not options.compile and not options.share:
+        parser.error("give record files to aggregate, --compile or --share")
+
+    if options.records:
+        keys = aggregate(options.knowledge, options.records, options.merge)
+        print("Wrote " + str(keys) + " keys to " + options.knowledge + ".",
+              file=sys.stderr)
+    if options.compile:
+        with open(options.knowledge) as knowledge_file:
+            compiled = parse_knowledge(knowledge_file.read())
+        try:
+            compile_snapshot(compiled, snapshot_path(options.knowledge))
+        except ValueError as error:
+            sys.exit("*** ERROR ***: " + str(error))
+        print("Compiled " + snapshot_path(options.knowledge) + ".",
+              file=sys.stderr)
+    if options.share:
+        with open(options.knowledge) as knowledge_file:
+            knowledge_base = parse_knowledge(knowledge_file.read())
+        try:
+            shared = SharedKnowledge(knowledge_base)
+        except ValueError as error:
+            sys.exit("*** ERROR ***: " + str(error))
+        print("Sharing " + options.knowledge + ". Start bots with "
+              "shm:" + shared.name + " as their knowledge.", file=sys.stderr)
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            shared.close()
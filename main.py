@@ -1,11 +1,21 @@
-import random
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
+from deck import to_card
+from engine import DecisionTreeAgent, GameEngine, HumanAgent, knowledge_key
+from evaluator import HandState
 from holdem import Poker
+from knowledge import KnowledgeProvider, OutcomeLog, text_knowledge_path
+from preflop import PreflopTable
 
 """ Texas Hold Em AI Poker Bot.
 
-This module runs a game of Texas Hold Em using an AI bot against a human. 
+This module runs a game of Texas Hold Em using an AI bot against a human.
+The hands are played by the GameEngine of engine.py, with this module
+printing them to the console and asking the human for their actions.
+
+Usage:
+    python main.py <knowledge file>
 
 Authors:
     Charles Billingsley
@@ -18,305 +28,217 @@ Authors:
 # NOTE: Our AI Bot will be player 0 throughout the entire program.
 debug = False  # Set to True to see the debug statements
 editor_mode = False  # Set True to see loads of print statements.
+# Set True to sample the AI's odds across all cores instead of
+# looking them up in the knowledge file, see equity.py
+sample_odds = False
+# Set to a table written by preflop.py to look up the AI's
+# phase zero odds from its exact starting hand
+preflop_path = None
+# Set to a record file to log the outcome of every game, which is merged
+# into the knowledge file every compact_interval games, see knowledge.py
+outcome_log_path = None
+compact_interval = 50
 number_of_players = 2
-dealer = 0  # Dealer will start by default to be player 0.
-game_num = 1  # Will keep track of how many games have been played so far.
-player_winnings = []
-knowledge = {}
-ai_scores = ""
-
-for i in range(0, number_of_players):
-    # Set all players initial winnings to 0
-    player_winnings.append(0)
-
-poker = Poker(number_of_players, debug)
-if not poker:
-    sys.exit(
-        "*** ERROR ***: "
-        "Invalid number of players. It must be between 2 and 22."
-    )
-
-
-# Check for an input file
-if len(sys.argv) == 2:
-    # Use knowledge to play.
-    with open(sys.argv[1]) as file:
-        knowledge = poker.convert_knowledge_to_dict(file.read())
-elif len(sys.argv) < 2:
-    print("Too few arguments provided")
-    sys.exit(2)
-elif len(sys.argv) > 2:
-    print("Too many arguments")
-    sys.exit(2)
-
-# Check for editor mode
-action = input("Editor mode on? (y/n)\n")
-if action.strip().lower() == "y":
-    print("Editor mode on.")
-    editor_mode = True
-elif action.strip().lower() != "n":
-    print("Unknown response. Defaulting editor mode to off.")
-
-# Time to play the game!
-while True:
-    print("Starting game #" + str(game_num)
-          + ".  Dealer is player " + str(dealer)
-          + ".  Entry fee is $50 per player.")
-    player_statuses = {}
-
-    # Set the initial statuses to hold with entry fee of $50
-    for i in range(0, number_of_players):
-        player_statuses[i] = [50, "hold"]
-
-    highest_bid = 50
-
-    print("1. Shuffling")
-    poker.shuffle()
-
-    print("2. Cutting")
-    if not poker.cut(random.randint(1, 51)):
-        # Cannot cut 0, or the number of cards in the deck
-        sys.exit("*** ERROR ***: Invalid amount entered to cut the deck.")
-
-    print("3. Distributing")
-    players_hands = poker.distribute()
-    if not players_hands:
-        sys.exit("*** ERROR ***: Insufficient cards to distribute.")
-
-    print("4. Hands")
-    print("-----------------------")
-    poker.print_all_hands(players_hands, editor_mode)
-
-    # Calculate AI's odds based on its hand
-    ai_scores = str(poker.score(players_hands[0])[0])
-    chances_of_winning = poker.get_winning_odds(ai_scores, knowledge)
-
-    if editor_mode:
-        print("PHASE ZERO ODDS: " + str(chances_of_winning))
-
-    # Bidding
-    highest_bid = poker.bidding(dealer, player_statuses, highest_bid,
-                                int(chances_of_winning*100), 0)
-
-    print("-----------------------")
-    # Gets and prints the community cards
-    print("5. Community Cards")
-    print("-----------------------")
-
-    # Gets the flop
-    card = poker.get_flop()
-    if not card:
-        sys.exit("*** ERROR ***: Insufficient cards to distribute.")
-    community_cards = card
-
-    # Re-print hands.
-    poker.print_all_hands(players_hands, editor_mode)
-
-    # Print community cards.
-    text = "Community - "
-    for card in community_cards:
-        text += str(card) + "  "
-    print(text)
-
-    # Sort and determine score of AI's hand and community cards
-    total = players_hands[0] + community_cards
-    total.sort(key=lambda x: x.value)
-    ai_scores = ai_scores + "," + str(poker.score(total)[0])
-    chances_of_winning = poker.get_winning_odds(ai_scores, knowledge)
-    if editor_mode:
-        print("PHASE ONE ODDS: " + str(chances_of_winning))
-
-    # Bidding
-    highest_bid = poker.bidding(dealer, player_statuses, highest_bid,
-                                int(chances_of_winning*100), 1)
-
-    # Gets the Turn
-    card = poker.get_one()
-    if not card:
-        sys.exit("*** ERROR ***: Insufficient cards to distribute.")
-    community_cards.extend(card)
-
-    # Re-print hands.
-    poker.print_all_hands(players_hands, editor_mode)
-
-    # Print community cards.
-    text = "Community - "
-    for card in community_cards:
-        text += str(card) + "  "
-    print(text)
-
-    # Sort and determine score of AI's hand and community cards again
-    total = players_hands[0] + community_cards
-    total.sort(key=lambda x: x.value)
-    ai_scores = ai_scores + "," + str(poker.score(total)[0])
-    chances_of_winning = poker.get_winning_odds(ai_scores, knowledge)
-    if editor_mode:
-        print("PHASE TWO ODDS: " + str(chances_of_winning))
-
-    # Bidding
-    highest_bid = poker.bidding(dealer, player_statuses, highest_bid,
-                                int(chances_of_winning*100), 2)
-
-    # Gets the River
-    card = poker.get_one()
-    if not card:
-        sys.exit("*** ERROR ***: Insufficient cards to distribute.")
-    community_cards.extend(card)
-
-    # Re-print hands.
-    poker.print_all_hands(players_hands, editor_mode)
-
-    # Print community cards.
-    text = "Community - "
-    for card in community_cards:
-        text += str(card) + "  "
-    print(text)
-
-    # Sort and determine score of AI's hand and community cards again
-    total = players_hands[0] + community_cards
-    total.sort(key=lambda x: x.value)
-    ai_scores = ai_scores + "," + str(poker.score(total)[0])
-    chances_of_winning = poker.get_winning_odds(ai_scores, knowledge)
-    if editor_mode:
-        print("PHASE THREE ODDS: " + str(chances_of_winning))
-
-    # Make sure that the AI
-    # isn't counting on a win from solely to community cards
-    temp = community_cards
-    temp.sort(key=lambda x: x.value)
-    if poker.score(total)[0] == poker.score(temp)[0]:
-        ai_scores = ai_scores + "," + str(1)
-    else:
-        ai_scores = ai_scores + "," + str(0)
-    chances_of_winning = poker.get_winning_odds(ai_scores, knowledge)
-    if editor_mode:
-        print("PHASE FOUR ODDS: " + str(chances_of_winning))
-
-    # Bidding
-    highest_bid = poker.bidding(dealer, player_statuses, highest_bid,
-                                int(chances_of_winning*100), 3)
-
-    print("-----------------------")
-    print("6. Determining Score")
-    try:
-        results = poker.determine_score(community_cards, players_hands)
-    except:
-        sys.exit("*** ERROR ***: Problem determining the score.")
-
-    print("7. Determining Winner")
-    try:
-        winner = poker.determine_winner(results)
-    except:
-        sys.exit("*** ERROR ***: Problem determining the winner.")
-
-    # Checks to see if the hand has ended in a tie and
-    # displays the appropriate message
-    tie = True
-    try:
-        len(winner)
-    except:
-        tie = False
-
-    # Code only works for 2 players.
-    p0 = player_statuses.get(0)[1]
-    p1 = player_statuses.get(1)[1]
-
-    if p0 == "fold" and p1 == "fold":
-        print("Both players folded. There are no winners. (??)")
-    elif p0 == "fold" and p1 != "fold":
-        i = 0
-        print("-------- Winner has Been Determined By Fold --------")
-        for hand in players_hands:
-            if i != 0:
-                text = "Winner ** Player " + str(i) + " ** "
-                # Transfer winnings.
-                player_winnings[i] += \
-                    player_statuses.get((i+1) % number_of_players)[0]
-            else:
-                text = "Loser  -- Player " + str(i) + " -- "
-                # Subtract losses.
-                player_winnings[i] -= player_statuses.get(i)[0]
-            for c in hand:
-                text += str(c) + "  "
 
-            text += " --- " + poker.name_of_hand(results[i][0])
-            i += 1
-            print(text)
-    elif p0 != "fold" and p1 == "fold":
-        i = 0
-        print("-------- Winner has Been Determined By Fold --------")
-        for hand in players_hands:
-            if i != 1:
-                text = "Winner ** Player " + str(i) + " ** "
-                # Transfer winnings.
-                player_winnings[i] += \
-                    player_statuses.get((i+1) % number_of_players)[0]
-            else:
-                text = "Loser  -- Player " + str(i) + " -- "
-                # Subtract losses.
-                player_winnings[i] -= player_statuses.get(i)[0]
-            for c in hand:
-                text += str(c) + "  "
 
-            text += " --- " + poker.name_of_hand(results[i][0])
-            i += 1
+class ConsoleObserver:
+    """
+    Class printing the events of each hand to the console
+    """
+
+    def __init__(self, editor_mode):
+        """
+        Constructor for the ConsoleObserver class.
+
+        :param editor_mode: whether or not to show the AI's hand
+        """
+        self.editor_mode = editor_mode
+        self.hands = []
+
+    def __call__(self, event, data):
+        """
+        Prints an event of a hand.
+
+        :param event: the name of the event
+        :param data: a dictionary of the event's data
+        """
+        if event == "start":
+            print("Starting game #" + str(data["game"])
+                  + ".  Dealer is player " + str(data["dealer"])
+                  + ".  Entry fee is $" + str(data["entry_fee"])
+                  + " per player.")
+            print("1. Shuffling")
+            print("2. Cutting")
+            print("3. Distributing")
+        elif event == "deal":
+            self.hands = data["hands"]
+            print("4. Hands")
+            print("-----------------------")
+            Poker.print_all_hands(self.hands, self.editor_mode)
+        elif event == "board":
+            if data["phase"] == 1:
+                print("-----------------------")
+                # Gets and prints the community cards
+                print("5. Community Cards")
+                print("-----------------------")
+            # Re-print hands.
+            Poker.print_all_hands(self.hands, self.editor_mode)
+            text = "Community - "
+            for card in data["community_cards"]:
+                text += str(to_card(card)) + "  "
             print(text)
-    elif not tie:
-        counter = 0
-        print("-------- Winner has Been Determined --------")
-        for hand in players_hands:
-            if counter == winner:
-                text = "Winner ** Player " + str(counter) + " ** "
-                # Transfer winnings.
-                player_winnings[counter] \
-                    += player_statuses.get((counter+1) % number_of_players)[0]
-            else:
-                text = "Loser  -- Player " + str(counter) + " -- "
-                # Subtract losses.
-                player_winnings[counter] -= player_statuses.get(counter)[0]
-            for c in hand:
-                text += str(c) + "  "
-
-            text += " --- " + poker.name_of_hand(results[counter][0])
-            counter += 1
+        elif event == "action":
+            text = "PLAYER " + str(data["player"]) + ": " + data["action"]
+            if data["action"] == "raise":
+                text += " by " + str(data["amount"])
             print(text)
-    else:
-        counter = 0
-        print("--------- Tie has Been Determined --------")
-        for hand in players_hands:
-            if counter in winner:
-                text = "Winner ** Player " + str(counter) + " ** "
-                # Transfer winnings.
-                player_winnings[counter] \
-                    += player_statuses.get((counter+1) % number_of_players)[0]
+        elif event == "result":
+            self.print_result(data)
+
+    @staticmethod
+    def print_result(result):
+        """
+        Prints who won a hand and why.
+
+        :param result: the result of the hand, see GameEngine.hand
+        """
+        print("-----------------------")
+        print("6. Determining Score")
+        print("7. Determining Winner")
+        if "fold" in result["statuses"]:
+            print("-------- Winner has Been Determined By Fold --------")
+        elif len(result["winners"]) == 1:
+            print("-------- Winner has Been Determined --------")
+        else:
+            print("--------- Tie has Been Determined --------")
+        for i in range(len(result["hands"])):
+            if i in result["winners"]:
+                text = "Winner ** Player " + str(i) + " ** "
             else:
-                text = "Loser  -- Player " + str(counter) + " -- "
-                # Subtract losses.
-                player_winnings[counter] -= player_statuses.get(counter)[0]
-            for c in hand:
-                text += str(c) + "  "
-
-            text += " --- " + poker.name_of_hand(results[counter][0])
-            counter += 1
+                text = "Loser  -- Player " + str(i) + " -- "
+            for card in result["hands"][i]:
+                text += str(to_card(card)) + "  "
+            text += " --- " + Poker.name_of_hand(result["results"][i][0])
             print(text)
+        print("Pot won: $" + str(result["pot"]) + ".")
+
+
+def record_outcome(outcome_log, knowledge, result):
+    """
+    Logs the AI's scores and whether it won the showdown, and counts the
+    game into the knowledge when it can be changed.
+
+    :param outcome_log: the OutcomeLog to append to
+    :param knowledge: the knowledge the AI is playing with
+    :param result: the result of the hand, see GameEngine.hand
+    """
+    # Learn from the showdown, whether or not anyone folded
+    ai_won = 1 if 0 in result["showdown_winners"] else 0
+    board_score = HandState(result["community_cards"]).score()[0]
+    key = outcome_log.write(
+        knowledge_key(result["hands"][0], result["community_cards"])[:4],
+        board_score, ai_won)
+    if hasattr(knowledge, "record"):
+        # Snapshots are read only, and pick it up at the next compaction
+        knowledge.record(key, ai_won)
+
+
+def main(arguments):
+    """
+    Plays games between the AI and a human until the human stops.
+
+    :param arguments: the command line arguments, without the program name
+    """
+    global editor_mode
+
+    # Check for an input file
+    if len(arguments) < 1:
+        print("Too few arguments provided")
+        sys.exit(2)
+    elif len(arguments) > 1:
+        print("Too many arguments")
+        sys.exit(2)
+    # Use knowledge to play.
+    # A compiled snapshot is memory mapped when there is one, and both
+    # are reloaded in the background whenever they change
+    knowledge_path = arguments[0]
+    knowledge_provider = KnowledgeProvider(knowledge_path)
+    knowledge_generation = 0
+
+    poker = Poker(number_of_players, debug)
+    equity_pool = None
+    if sample_odds:
+        # Kept open for the whole session so every decision reuses the workers
+        equity_pool = ProcessPoolExecutor()
+    preflop_table = None
+    if preflop_path:
+        preflop_table = PreflopTable(preflop_path)
+    outcome_log = None
+    if outcome_log_path:
+        # Outcomes are merged into a text knowledge file, so that is
+        # checked for before any games are played
+        try:
+            text_knowledge_path(knowledge_path)
+        except ValueError as error:
+            sys.exit("*** ERROR ***: " + str(error))
+        outcome_log = OutcomeLog(outcome_log_path)
+
+    # Check for editor mode
+    action = input("Editor mode on? (y/n)\n")
+    if action.strip().lower() == "y":
+        print("Editor mode on.")
+        editor_mode = True
+    elif action.strip().lower() != "n":
+        print("Unknown response. Defaulting editor mode to off.")
+
+    def ai_odds(hand, community_cards):
+        """
+        Gets the AI's odds when they aren't looked up in the knowledge.
+
+        :param hand: the AI's hand
+        :param community_cards: the community cards dealt so far
+        :return: the odds of winning, or None to use the knowledge
+        """
+        if preflop_table and not community_cards:
+            return preflop_table.equity(hand)
+        if sample_odds:
+            return poker.get_sampled_odds(hand, community_cards, equity_pool)
+        return None
+
+    ai = DecisionTreeAgent(odds=ai_odds, verbose=editor_mode)
+    agents = [ai] + [HumanAgent() for i in range(1, number_of_players)]
+    game = GameEngine(agents, poker, observers=[ConsoleObserver(editor_mode)])
+
+    # Time to play the game!
+    while True:
+        # The knowledge is only swapped between games, never mid hand
+        knowledge, generation = knowledge_provider.current()
+        if editor_mode and generation != knowledge_generation:
+            print("Using knowledge generation " + str(generation))
+        knowledge_generation = generation
+        ai.knowledge = knowledge
+
+        result = game.play_hand()
+
+        if outcome_log:
+            record_outcome(outcome_log, knowledge, result)
+            if game.hands_played % compact_interval == 0:
+                outcome_log.compact(knowledge_path)
+
+        action = input("Keep playing? (y/n)\n")
+        if action.strip().lower() == "n":
+            # Get total winnings.
+            i = 0
+            for winnings in game.chips:
+                print("Player " + str(i) + " Winnings: " + str(winnings))
+                i += 1
+            if outcome_log:
+                outcome_log.compact(knowledge_path)
+                outcome_log.close()
             break
+        elif action.strip().lower() != "y":
+            print("Invalid entry. Starting new game.")
+
 
-    pot = 0
-    for player in player_statuses:
-        pot += int(player_statuses[player][0])
-    print("Pot won: $" + str(pot) + ".")
-
-    action = input("Keep playing? (y/n)\n")
-    if action.strip().lower() == "n":
-        # Get total winnings.
-        i = 0
-        for winnings in player_winnings:
-            print("Player " + str(i) + " Winnings: " + str(winnings))
-            i += 1
-        break
-    elif action.strip().lower() != "y":
-        print("Invalid entry. Starting new game.")
-
-    # Increment stuff.
-    dealer = (dealer + 1) % number_of_players
-    game_num += 1
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,229 @@
+import argparse
+import sys
+from array import array
+
+from betting import ACTIONS
+from holdem import Poker
+
+try:
+    import numpy
+except ImportError:  # numpy is only needed by decide_batch
+    numpy = None
+
+""" Compiled AI Policy.
+This module compiles the AI's bidding policy into a lookup table.
+
+The AI's action only depends on the phase, its odds of winning, how far the
+highest bid has risen this phase, and whether it has matched the highest
+bid. Past the largest upper bound the AI can have, the rise makes no more
+difference, so the table holds every case:
+
+    [phase][odds 0 through 100][rise 0 through the largest bound][matched]
+
+Each cell holds the action, and the amount to raise by for a raise. The
+table is compiled from Poker.upper_bound and Poker.decision_tree themselves,
+once for each set of phase ratios, and verify checks every cell of it
+against them.
+
+The decision tree only sees the odds through the upper bound, and decides
+every rise past the upper bound the same. The row of rises of each phase and
+upper bound is worked out once, and shared by every set of ratios compiled
+in the process, so trying many sets of ratios only costs the new rows.
+
+Usage:
+    python policy.py [--ratios T:S:R,T:S:R,T:S:R,T:S:R]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+PHASES = 4
+ODDS = 101  # Odds of 0 through 100
+
+# The compiled policies, keyed by their phase ratios
+compiled = {}
+# The decisions of every rise up to an upper bound, keyed by the phase and
+# the upper bound
+rows = {}
+
+
+def tree_row(phase, upper_bound):
+    """
+    Gets the decision tree's actions for each rise up to an upper bound,
+    working them out the first time they are used.
+
+    :param phase: which phase the game is in
+    :param upper_bound: the upper bound of the AI's bids this phase
+    :return: arrays of the actions and raise amounts of rises 0 through
+             the upper bound, laid out as the table is
+    """
+    row = rows.get((phase, upper_bound))
+    if row is None:
+        actions = array("B")
+        amounts = array("H")
+        for rise in range(upper_bound + 1):
+            for matched in (0, 1):
+                # Any previous highest gives the same decision
+                highest_bid = 1000 + rise
+                bid = highest_bid if matched else highest_bid - 1
+                decision = Poker.decision_tree(highest_bid, 1000, bid,
+                                               upper_bound, phase)
+                actions.append(ACTIONS.index(decision[0]))
+                amounts.append(decision[1] if decision[0] == "raise" else 0)
+        row = (actions, amounts)
+        rows[(phase, upper_bound)] = row
+    return row
+
+
+class Policy:
+    """
+    Class holding the AI's action for every case it can face
+    """
+
+    def __init__(self, ratios=None):
+        """
+        Constructor for the Policy class. Compiles the table.
+
+        :param ratios: the ratios of each phase, Poker.PHASE_RATIOS by default
+        """
+        self.ratios = tuple(tuple(phase) for phase in
+                            (ratios or Poker.PHASE_RATIOS))
+        # One more rise than the largest bound, where every rise after it
+        # is decided the same
+        self.width = max(Poker.upper_bound(odds, phase, self.ratios)
+                         for phase in range(PHASES)
+                         for odds in range(ODDS)) + 1
+        size = PHASES * ODDS * self.width * 2
+        self.actions = array("B", bytes(size))
+        self.amounts = array("H", bytes(2 * size))
+
+        for phase in range(PHASES):
+            for odds in range(ODDS):
+                upper_bound = Poker.upper_bound(odds, phase, self.ratios)
+                actions, amounts = tree_row(phase, upper_bound)
+                # Every rise past the upper bound is decided as it is
+                padding = self.width - upper_bound - 1
+                start = self.index(phase, odds, 0, 0)
+                end = start + 2 * self.width
+                self.actions[start:end] = actions + actions[-2:] * padding
+                self.amounts[start:end] = amounts + amounts[-2:] * padding
+
+    def index(self, phase, odds, rise, matched):
+        """
+        Gets where a case is held in the table.
+
+        :param phase: which phase the game is in
+        :param odds: the odds of winning, 0 through 100
+        :param rise: how far the highest bid has risen this phase
+        :param matched: 1 if the AI has matched the highest bid, else 0
+        :return: the index of the case
+        """
+        rise = min(rise, self.width - 1)
+        return ((phase * ODDS + odds) * self.width + rise) * 2 + matched
+
+    def decide(self, phase, odds, highest_bid, prev_round_highest, bid):
+        """
+        Looks the AI's action up.
+
+        :param phase: which phase the game is in
+        :param odds: the odds of winning, 0 through 100
+        :param highest_bid: the highest bid currently out
+        :param prev_round_highest: the highest bid when the phase started
+        :param bid: the most the AI has bid
+        :return: the action, and the amount to raise by
+        """
+        index = self.index(phase, odds, highest_bid - prev_round_highest,
+                           1 if bid == highest_bid else 0)
+        return ACTIONS[self.actions[index]], self.amounts[index]
+
+    def decide_batch(self, phases, odds, highest_bids, prev_round_highests,
+                     bids):
+        """
+        Looks up the AI's actions for many cases at once, with numpy.
+
+        :param phases: the phase of each case
+        :param odds: the odds of winning of each case, 0 through 100
+        :param highest_bids: the highest bid of each case
+        :param prev_round_highests: the highest bid at the start of each
+                                    case's phase
+        :param bids: the most the AI has bid in each case
+        :return: a list of the action, and the amount to raise by,
+                 of each case
+        """
+        if numpy is None:
+            sys.exit("*** ERROR ***: numpy is needed to decide in batches.")
+        highest_bids = numpy.asarray(highest_bids)
+        rises = numpy.minimum(
+            highest_bids - numpy.asarray(prev_round_highests),
+            self.width - 1)
+        matched = (numpy.asarray(bids) == highest_bids).astype(numpy.int64)
+        indexes = ((numpy.asarray(phases) * ODDS + numpy.asarray(odds))
+                   * self.width + rises) * 2 + matched
+        actions = numpy.frombuffer(self.actions, numpy.uint8)[indexes]
+        amounts = numpy.frombuffer(self.amounts, numpy.uint16)[indexes]
+        return [(ACTIONS[action], int(amount))
+                for action, amount in zip(actions.tolist(), amounts.tolist())]
+
+    def verify(self, extra_rises=50):
+        """
+        Checks every case of the table against the decision tree.
+
+        :param extra_rises: how many rises past the table's width to check
+        :return: a list of the cases that don't match, as (phase, odds,
+                 rise, matched, table decision, tree decision)
+        """
+        mismatches = []
+        for phase in range(PHASES):
+            for odds in range(ODDS):
+                upper_bound = Poker.upper_bound(odds, phase, self.ratios)
+                for rise in range(self.width + extra_rises):
+                    for matched in (0, 1):
+                        highest_bid = 50 + rise
+                        bid = highest_bid if matched else 50
+                        tree = Poker.decision_tree(highest_bid, 50, bid,
+                                                   upper_bound, phase)
+                        if tree[0] != "raise":
+                            tree = [tree[0], 0]
+                        table = self.decide(phase, odds, highest_bid, 50, bid)
+                        if table != tuple(tree):
+                            mismatches.append((phase, odds, rise, matched,
+                                               table, tuple(tree)))
+        return mismatches
+
+
+def compile_policy(ratios=None):
+    """
+    Gets the compiled policy of some phase ratios, compiling it the first
+    time they are used.
+
+    :param ratios: the ratios of each phase, Poker.PHASE_RATIOS by default
+    :return: the Policy of the ratios
+    """
+    key = tuple(tuple(phase) for phase in (ratios or Poker.PHASE_RATIOS))
+    policy = compiled.get(key)
+    if policy is None:
+        policy = Policy(key)
+        compiled[key] = policy
+    return policy
+
+
+if __name__ == "__main__":
+    from tournament import parse_ratios
+
+    parser = argparse.ArgumentParser(
+        description="Compiles the AI's policy and checks it against the "
+                    "decision tree.")
+    parser.add_argument("--ratios", type=parse_ratios, default=None,
+                        help="phase ratios to compile, as "
+                             "threshold:strong ratio:ratio for each phase")
+    options = parser.parse_args()
+    checked = compile_policy(options.ratios)
+    failed = checked.verify()
+    print("Checked " + str(len(checked.actions)) + " cases, "
+          + str(len(failed)) + " mismatches.")
+    for case in failed[:20]:
+        print(case)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,228 @@
+import mmap
+import random
+import struct
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from equity import exact_equity
+from evaluator import evaluate
+
+""" Preflop Equity Table.
+This module builds and reads a table of heads up preflop equities.
+
+There are 169 starting hands once the symbols are only told apart by whether
+the two cards share one. Each is given an index on a 13 by 13 grid of card
+values: pairs lie on the diagonal, suited hands have their higher value as
+the row and offsuit hands have their higher value as the column.
+
+The table file is laid out so it can be memory mapped and read in place:
+
+    header      magic, version, number of hands, samples per matchup
+    equities    169 float32, each hand's equity against a random hand
+    matchups    169 x 169 float32, the equity of the row hand against
+                the column hand
+
+Usage:
+    python preflop.py <output file> [samples per matchup]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+MAGIC = b"PFEQ"
+VERSION = 1
+HANDS = 169
+HEADER = struct.Struct("<4sHHI")
+FLOAT = struct.Struct("<f")
+
+# Where the sections of the file start
+EQUITIES_OFFSET = HEADER.size
+MATCHUPS_OFFSET = EQUITIES_OFFSET + HANDS * FLOAT.size
+FILE_SIZE = MATCHUPS_OFFSET + HANDS * HANDS * FLOAT.size
+
+
+def hand_index(hand):
+    """
+    Gets the index of a starting hand.
+
+    :param hand: the two card codes of the hand
+    :return: the index of the hand, 0 through 168
+    """
+    first = hand[0] >> 2
+    second = hand[1] >> 2
+    high = max(first, second)
+    low = min(first, second)
+    if hand[0] & 3 == hand[1] & 3:
+        return high * 13 + low
+    return low * 13 + high
+
+
+def index_hands(index):
+    """
+    Gets every pair of card codes making up a starting hand.
+
+    :param index: the index of the hand
+    :return: a list of the hands, which are lists of two card codes
+    """
+    row, column = divmod(index, 13)
+    hands = []
+    for first in range(row * 4, row * 4 + 4):
+        for second in range(column * 4, column * 4 + 4):
+            # A pair's cards share a value, so each hand is only taken once
+            if (row != column or first < second) \
+                    and hand_index([first, second]) == index:
+                hands.append([first, second])
+    return hands
+
+
+def hand_name(index):
+    """
+    Gets the human readable name of a starting hand, such as AKs or 77.
+
+    :param index: the index of the hand
+    :return: the name of the hand
+    """
+    names = "23456789TJQKA"
+    row, column = divmod(index, 13)
+    if row == column:
+        return names[row] * 2
+    if row > column:
+        return names[row] + names[column] + "s"
+    return names[column] + names[row] + "o"
+
+
+def row_matchups(index, samples, seed):
+    """
+    Samples the equity of a starting hand against each hand indexed
+    after it. Ties count as half a win.
+
+    :param index: the index of the hand
+    :param samples: how many deals to sample for each matchup
+    :param seed: the seed of the random number generator
+    :return: the index, and a list of the equities against each later hand
+    """
+    rng = random.Random(seed)
+    hands = index_hands(index)
+    row = []
+    for other in range(index + 1, HANDS):
+        others = index_hands(other)
+        points = 0
+        dealt = 0
+        while dealt < samples:
+            hand = rng.choice(hands)
+            other_hand = rng.choice(others)
+            if hand[0] in other_hand or hand[1] in other_hand:
+                continue  # The two hands must not share a card
+            dead = hand + other_hand
+            board = rng.sample([card for card in range(52)
+                                if card not in dead], 5)
+            rank = evaluate(hand + board)
+            other_rank = evaluate(other_hand + board)
+            if rank > other_rank:
+                points += 2
+            elif rank == other_rank:
+                points += 1
+            dealt += 1
+        row.append(points / (2 * samples))
+    return index, row
+
+
+def hand_equity(index, seed):
+    """
+    Works out the equity of a starting hand against a random hand.
+
+    :param index: the index of the hand
+    :param seed: the seed of the random number generator
+    :return: the index, and the equity of the hand
+    """
+    result = exact_equity(index_hands(index)[0], rng=random.Random(seed))
+    return index, result["win"] + result["tie"] / 2
+
+
+def generate(path, samples=1000, seed=0, workers=None):
+    """
+    Builds the preflop table using every core, and writes it to a file.
+
+    :param path: the file to write the table to
+    :param samples: how many deals to sample for each matchup
+    :param seed: the seed each hand's random number generator is offset from
+    :param workers: the number of processes, all cores by default
+    """
+    equities = [0.0] * HANDS
+    matchups = [[0.5] * HANDS for i in range(HANDS)]
+
+    with ProcessPoolExecutor(workers) as pool:
+        indexes = range(HANDS)
+        seeds = [seed + index for index in indexes]
+        for index, value in pool.map(hand_equity, indexes, seeds):
+            equities[index] = value
+        seeds = [seed + HANDS + index for index in indexes]
+        for index, row in pool.map(row_matchups, indexes,
+                                   [samples] * HANDS, seeds):
+            for other, value in enumerate(row, index + 1):
+                matchups[index][other] = value
+                matchups[other][index] = 1 - value
+
+    with open(path, "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, HANDS, samples))
+        file.write(struct.pack("<" + str(HANDS) + "f", *equities))
+        for row in matchups:
+            file.write(struct.pack("<" + str(HANDS) + "f", *row))
+
+
+class PreflopTable:
+    """
+    Class reading a preflop table in place from a memory mapped file
+    """
+
+    def __init__(self, path):
+        """
+        Constructor for the PreflopTable class.
+
+        :param path: the file the table was written to
+        """
+        with open(path, "rb") as file:
+            self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, hands, self.samples = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION or hands != HANDS \
+                or len(self.map) != FILE_SIZE:
+            self.map.close()
+            sys.exit("*** ERROR ***: " + path + " is not a preflop table.")
+
+    def equity(self, hand):
+        """
+        Gets the equity of a starting hand against a random hand.
+
+        :param hand: the two card codes of the hand
+        :return: the equity of the hand
+        """
+        offset = EQUITIES_OFFSET + hand_index(hand) * FLOAT.size
+        return FLOAT.unpack_from(self.map, offset)[0]
+
+    def matchup(self, hand, other_hand):
+        """
+        Gets the equity of a starting hand against another.
+
+        :param hand: the two card codes of the hand
+        :param other_hand: the two card codes of the other hand
+        :return: the equity of the hand against the other hand
+        """
+        cell = hand_index(hand) * HANDS + hand_index(other_hand)
+        return FLOAT.unpack_from(self.map, MATCHUPS_OFFSET
+                                 + cell * FLOAT.size)[0]
+
+    def close(self):
+        """
+        Unmaps the table's file.
+        """
+        self.map.close()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("Usage: python preflop.py <output file> [samples per matchup]")
+        sys.exit(2)
+    generate(sys.argv[1], int(sys.argv[2]) if len(sys.argv) == 3 else 1000)
@@ -0,0 +1,91 @@
+from collections import OrderedDict
+
+""" Hand Score Cache.
+This module holds a bounded cache of hand scores.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+
+def canonical(hand):
+    """
+    Gets the suit isomorphic form of a hand. Renaming the symbols of a hand
+    never changes its score, so every hand with the same values grouped the
+    same way by symbol shares one canonical form.
+
+    :param hand: the card codes of the hand
+    :return: a sorted tuple holding the sorted values of each symbol
+    """
+    suits = [[], [], [], []]
+    for card in hand:
+        suits[card & 3].append(card >> 2)
+    return tuple(sorted(tuple(sorted(values)) for values in suits if values))
+
+
+class ScoreCache:
+    """
+    Least recently used cache of hand scores, keyed by the evaluator
+    and the canonical form of each hand
+    """
+
+    def __init__(self, max_size=65536):
+        """
+        Constructor for the ScoreCache class.
+
+        :param max_size: the most scores to hold before evicting the oldest
+        """
+        self.max_size = max_size
+        self.scores = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def score(self, hand, score_function, evaluator="legacy"):
+        """
+        Gets the score of a hand, scoring it only if no equivalent
+        hand has been cached by the same evaluator.
+
+        :param hand: the card codes of the hand
+        :param score_function: scores the hand when it is not cached
+        :param evaluator: the name of the evaluator, since each one gives
+                          its kickers in a form of its own
+        :return: the score, and the kicker to be used in the event of a tie
+        """
+        key = (evaluator, canonical(hand))
+        cached = self.scores.get(key)
+        if cached is not None:
+            self.hits += 1
+            self.scores.move_to_end(key)
+        else:
+            self.misses += 1
+            result = score_function(hand)
+            cached = (result[0], tuple(result[1]))
+            self.scores[key] = cached
+            if len(self.scores) > self.max_size:
+                self.scores.popitem(last=False)
+                self.evictions += 1
+
+        # Callers may change the lists they get back, so they get fresh ones
+        return [cached[0], list(cached[1])]
+
+    def stats(self):
+        """
+        Gets the counters of the cache.
+
+        :return: a dictionary of the hits, misses, evictions and size
+        """
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "size": len(self.scores)}
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters.
+        """
+        self.scores.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -0,0 +1,371 @@
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from betting import ACTIONS
+from decision_service import WINDOW, DecisionService
+from deck import to_card
+from engine import DecisionTreeAgent, GameEngine
+from holdem import Poker
+from knowledge import load_knowledge
+
+""" Texas Hold Em Table Server.
+
+This module hosts many tables of Texas Hold Em at once, each played by one
+connected player against the AI. Every connection gets a table of its own,
+with its own game and deck, and all the tables share one read only copy of
+the knowledge. The AI's decisions are gathered into batches, see
+decision_service.py, and made on a pool of threads, so the event loop is
+never held up by them.
+
+The protocol is one JSON object per line. The server sends the events of
+each hand, such as
+
+    {"type": "deal", "hand": ["AS", "KD"]}
+
+and, when it is the player's turn,
+
+    {"type": "turn", "phase": 1, "to_call": 20, "actions": [...], ...}
+
+which the player answers with
+
+    {"action": "raise", "amount": 20}
+
+or {"action": "quit"} to leave the table. A player who doesn't answer in
+time checks when they can, and folds when they can't.
+
+Usage:
+    python server.py <knowledge file> [--host HOST] [--port PORT]
+                     [--unix PATH] [--timeout SECONDS] [--max-tables N]
+                     [--workers N] [--opponents N] [--batch-window S]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+debug = False  # Set to True to see the debug statements
+
+
+def card_names(cards):
+    """
+    Gets the human readable symbols of some cards.
+
+    :param cards: the card codes
+    :return: a list of the symbols of the cards
+    """
+    return [str(to_card(card)) for card in cards]
+
+
+class Table:
+    """
+    Class playing hands between one connected player and the AI
+    """
+
+    def __init__(self, table_id, reader, writer, knowledge, executor,
+                 timeout=30.0, opponents=1, seed=None, decisions=None):
+        """
+        Constructor for the Table class.
+
+        :param table_id: the number of the table
+        :param reader: the StreamReader of the player's connection
+        :param writer: the StreamWriter of the player's connection
+        :param knowledge: the knowledge the AI looks its odds up in
+        :param executor: the pool the AI's decisions are made on
+        :param timeout: the seconds the player has to act
+        :param opponents: the number of AI players at the table
+        :param seed: the seed of the table's random number generator
+        :param decisions: the DecisionService batching the AI's decisions,
+                          or None to make each one on the executor
+        """
+        self.table_id = table_id
+        self.reader = reader
+        self.writer = writer
+        self.executor = executor
+        self.decisions = decisions
+        self.timeout = timeout
+        self.seat = opponents  # The player sits after every AI
+        self.messages = []
+        rng = random.Random(seed)
+        # The player's seat is played over the connection, not by an agent
+        agents = [DecisionTreeAgent(knowledge) for i in range(opponents)]
+        agents.append(None)
+        self.game = GameEngine(agents, Poker(len(agents), debug, rng=rng),
+                               rng, observers=[self.observe])
+
+    def observe(self, event, data):
+        """
+        Queues the events of a hand to be sent to the player. Only the
+        player's own hand is sent until the showdown.
+
+        :param event: the name of the event
+        :param data: a dictionary of the event's data
+        """
+        if event == "deal":
+            data = {"hand": card_names(data["hands"][self.seat])}
+        elif event == "board":
+            data = {"phase": data["phase"],
+                    "community_cards": card_names(data["community_cards"])}
+        elif event == "result":
+            data = {"hands": [card_names(hand) for hand in data["hands"]],
+                    "community_cards": card_names(data["community_cards"]),
+                    "hand_names": [Poker.name_of_hand(result[0])
+                                   for result in data["results"]],
+                    "winners": data["winners"], "pot": data["pot"],
+                    "chips": data["chips"], "total": list(self.game.chips)}
+        message = {"type": event}
+        message.update(data)
+        self.messages.append(message)
+
+    async def send(self, message=None):
+        """
+        Sends the queued messages, and a message of its own if given.
+
+        :param message: a dictionary to send after the queued messages
+        """
+        if message is not None:
+            self.messages.append(message)
+        for queued in self.messages:
+            self.writer.write(json.dumps(queued).encode() + b"\n")
+        self.messages = []
+        await self.writer.drain()
+
+    async def ask(self, turn):
+        """
+        Asks the player for their action, until a valid one comes in or
+        they run out of time.
+
+        :param turn: the Turn to act on
+        :return: the action, and the amount to raise by
+        """
+        await self.send({"type": "turn", "phase": turn.phase,
+                         "hand": card_names(turn.hand),
+                         "community_cards": card_names(turn.community_cards),
+                         "highest_bid": turn.highest_bid, "bid": turn.bid,
+                         "to_call": turn.to_call, "actions": turn.actions,
+                         "timeout": self.timeout})
+        deadline = time.monotonic() + self.timeout
+        while True:
+            try:
+                line = await asyncio.wait_for(
+                    self.reader.readline(), deadline - time.monotonic())
+            except asyncio.TimeoutError:
+                # Checks when it is free, and folds when it isn't
+                return ("fold" if turn.to_call else "hold"), 0
+            if not line:
+                raise ConnectionError("the player left")
+            try:
+                request = json.loads(line)
+                action = str(request["action"]).strip().lower()
+                amount = int(request.get("amount", 0))
+            except (ValueError, KeyError, TypeError, AttributeError):
+                await self.send({"type": "error",
+                                 "message": "send {\"action\": ...}"})
+                continue
+            if action == "quit":
+                raise ConnectionError("the player quit")
+            if action not in ACTIONS:
+                await self.send({"type": "error",
+                                 "message": "actions are "
+                                            + ", ".join(turn.actions)})
+                continue
+            return action, amount
+
+    async def play_hand(self):
+        """
+        Plays a hand, asking the player for their actions and the AI for
+        its own on the pool of threads.
+
+        :return: the result of the hand, see GameEngine.hand
+        """
+        loop = asyncio.get_running_loop()
+        steps = self.game.hand()
+        try:
+            turn = next(steps)
+            while True:
+                await self.send()
+                if turn.player == self.seat:
+                    action = await self.ask(turn)
+                elif self.decisions is not None:
+                    action = await self.decisions.decide(turn)
+                else:
+                    action = await loop.run_in_executor(
+                        self.executor, self.game.agents[turn.player].act,
+                        turn)
+                turn = steps.send(action)
+        except StopIteration as stop:
+            await self.send()
+            return stop.value
+        finally:
+            steps.close()
+
+    async def play(self):
+        """
+        Plays hands until the player leaves.
+        """
+        await self.send({"type": "welcome", "table": self.table_id,
+                         "seat": self.seat,
+                         "players": len(self.game.agents),
+                         "timeout": self.timeout})
+        try:
+            while True:
+                await self.play_hand()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+
+class TableServer:
+    """
+    Class accepting connections and giving each one a table
+    """
+
+    def __init__(self, knowledge, timeout=30.0, max_tables=1000,
+                 workers=None, opponents=1, batch_window=WINDOW):
+        """
+        Constructor for the TableServer class.
+
+        :param knowledge: the knowledge every table's AI shares
+        :param timeout: the seconds a player has to act
+        :param max_tables: the most tables to host at once
+        :param workers: the threads the AI's decisions are made on
+        :param opponents: the number of AI players at each table
+        :param batch_window: the seconds the AI's decisions are gathered
+                             for to be made in batches, or 0 to make each
+                             one as it comes
+        """
+        self.knowledge = knowledge
+        self.timeout = timeout
+        self.max_tables = max_tables
+        self.opponents = opponents
+        self.executor = ThreadPoolExecutor(workers)
+        self.decisions = None
+        if batch_window > 0:
+            self.decisions = DecisionService(knowledge, self.executor,
+                                             window=batch_window)
+        self.table_ids = itertools.count(1)
+        self.tables = {}
+
+    async def connect(self, reader, writer):
+        """
+        Hosts a table for a new connection until it closes.
+
+        :param reader: the StreamReader of the connection
+        :param writer: the StreamWriter of the connection
+        """
+        if len(self.tables) >= self.max_tables:
+            writer.write(json.dumps({"type": "error",
+                                     "message": "the server is full"})
+                         .encode() + b"\n")
+            writer.close()
+            return
+        table = Table(next(self.table_ids), reader, writer, self.knowledge,
+                      self.executor, self.timeout, self.opponents,
+                      decisions=self.decisions)
+        self.tables[table.table_id] = table
+        if debug:
+            print("Opened table " + str(table.table_id) + ", "
+                  + str(len(self.tables)) + " open.", file=sys.stderr)
+        try:
+            await table.play()
+        except OSError:
+            pass  # The connection was lost while writing
+        finally:
+            del self.tables[table.table_id]
+            writer.close()
+            if debug:
+                print("Closed table " + str(table.table_id) + ", "
+                      + str(len(self.tables)) + " open.", file=sys.stderr)
+                if self.decisions is not None:
+                    print("Decisions: " + str(self.decisions.stats()),
+                          file=sys.stderr)
+
+    async def serve(self, host="127.0.0.1", port=7777, unix_path=None):
+        """
+        Accepts connections until cancelled.
+
+        :param host: the address to listen on
+        :param port: the TCP port to listen on
+        :param unix_path: a Unix socket to listen on instead of TCP
+        """
+        if unix_path:
+            server = await asyncio.start_unix_server(self.connect, unix_path)
+        else:
+            server = await asyncio.start_server(self.connect, host, port)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown(wait=False)
+            if self.decisions is not None:
+                print("Decisions: " + str(self.decisions.stats()),
+                      file=sys.stderr)
+
+
+def parse_arguments(arguments):
+    """
+    Reads the command line options of the server.
+
+    :param arguments: the command line arguments, without the program name
+    :return: the parsed options
+    """
+    parser = argparse.ArgumentParser(
+        description="Hosts tables of Texas Hold Em against the AI.")
+    parser.add_argument("knowledge", help="knowledge the AI plays with")
+    parser.add_argument("--host", default="127.0.0.1",
+                        help="address to listen on (default 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=7777,
+                        help="TCP port to listen on (default 7777)")
+    parser.add_argument("--unix", default=None,
+                        help="Unix socket to listen on instead of TCP")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="seconds a player has to act (default 30)")
+    parser.add_argument("--max-tables", type=int, default=1000,
+                        help="most tables to host at once (default 1000)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="threads the AI decides on")
+    parser.add_argument("--opponents", type=int, default=1,
+                        help="AI players at each table, 1 to 9 (default 1)")
+    parser.add_argument("--batch-window", type=float, default=WINDOW,
+                        help="seconds to gather the AI's decisions for, "
+                             "0 to make each one alone "
+                             "(default " + str(WINDOW) + ")")
+    options = parser.parse_args(arguments)
+
+    if options.opponents < 1 or options.opponents > 9:
+        parser.error("the number of opponents must be between 1 and 9")
+    if options.timeout <= 0:
+        parser.error("the timeout must be more than 0")
+    if options.batch_window < 0:
+        parser.error("the batch window can't be negative")
+    return options
+
+
+def main(arguments):
+    """
+    Runs the server from the command line.
+
+    :param arguments: the command line arguments, without the program name
+    """
+    options = parse_arguments(arguments)
+    # One copy, memory mapped when compiled, is read by every table
+    knowledge = load_knowledge(options.knowledge)
+    server = TableServer(knowledge, options.timeout, options.max_tables,
+                         options.workers, options.opponents,
+                         options.batch_window)
+    print("Serving on " + (options.unix or options.host + ":"
+                           + str(options.port)) + ".", file=sys.stderr)
+    try:
+        asyncio.run(server.serve(options.host, options.port, options.unix))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
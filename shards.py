@@ -0,0 +1,38 @@
+import random
+
+""" Work Shards.
+This module splits a run of hands into shards played across a pool of
+processes, each with a seed of its own drawn from the master seed, so a run
+is reproducible for a given seed and number of shards.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+
+def shard_seeds(master_seed, shards):
+    """
+    Derives the seed of each shard from the master seed.
+
+    :param master_seed: the seed of the whole run
+    :param shards: the number of shards
+    :return: a list of the seed of each shard
+    """
+    rng = random.Random(master_seed)
+    return [rng.getrandbits(64) for i in range(shards)]
+
+
+def split_counts(hands, shards):
+    """
+    Splits hands between shards. The first shards play one extra hand when
+    the hands don't divide evenly.
+
+    :param hands: the number of hands to play
+    :param shards: the number of shards
+    :return: a list of the number of hands each shard plays
+    """
+    return [hands // shards + (1 if i < hands % shards else 0)
+            for i in range(shards)]
@@ -0,0 +1,140 @@
+import pickle
+
+import pytest
+
+from betting import BettingRound
+
+""" Betting Round Tests.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+
+def new_round(players=2, first_player=0, max_raises=None):
+    """
+    Starts a betting phase where everyone has paid the same.
+
+    :param players: the number of players
+    :param first_player: the id of the player to act first
+    :param max_raises: how many raises the phase allows
+    :return: the BettingRound
+    """
+    return BettingRound([50] * players, ["hold"] * players, first_player,
+                        max_raises)
+
+
+def test_ends_once_everyone_holds():
+    """
+    The phase ends once every player has acted with nothing to call.
+    """
+    betting = new_round(3, first_player=1)
+    assert betting.player == 1
+    for player in (1, 2, 0):
+        assert not betting.done
+        assert betting.player == player
+        assert betting.act("hold") == ("hold", 0)
+    assert betting.done
+    with pytest.raises(ValueError):
+        betting.act("hold")
+
+
+def test_raise_is_answered_by_everyone():
+    """
+    A raise has to be answered by every other player still in, and the
+    phase ends when they have matched it.
+    """
+    betting = new_round(3)
+    betting.act("hold")
+    assert betting.act("raise", 20) == ("raise", 20)
+    assert betting.player == 2 and betting.to_call == 20
+    betting.act("call")
+    assert betting.player == 0 and betting.to_call == 20
+    betting.act("call")
+    assert betting.done
+    assert betting.bids == [70, 70, 70]
+    assert betting.pot == 210
+
+
+def test_raise_cap():
+    """
+    Once the raises run out, raising is no longer offered, and a raise
+    is taken as a call.
+    """
+    betting = new_round(2, max_raises=1)
+    assert betting.raises_left == 1
+    assert "raise" in betting.actions
+    betting.act("raise", 10)
+    assert betting.raises_left == 0
+    assert betting.actions == ["fold", "call"]
+    assert betting.act("raise", 10) == ("call", 0)
+    assert betting.done
+    assert betting.bids == [60, 60]
+
+
+def test_no_cap_by_default():
+    """
+    Without a cap, the players may keep raising each other.
+    """
+    betting = new_round(2)
+    for i in range(20):
+        assert betting.act("raise", 5) == ("raise", 5)
+    assert betting.raises_left is None
+    assert not betting.done
+    betting.act("call")
+    assert betting.done
+    assert betting.bids == [150, 150]
+
+
+def test_ends_when_all_but_one_fold():
+    """
+    The phase ends as soon as one player is left, even if they haven't
+    acted, and players who folded before it started never act.
+    """
+    betting = BettingRound([50, 50, 50, 50], ["hold", "fold", "hold", "hold"],
+                           0)
+    betting.act("raise", 10)
+    assert betting.player == 2
+    betting.act("fold")
+    assert betting.player == 3
+    betting.act("fold")
+    assert betting.done
+    assert betting.active() == [0]
+    assert betting.statuses == ["raise", "fold", "fold", "fold"]
+
+
+def test_illegal_actions_are_made_legal():
+    """
+    Actions are read loosely, and turned into the nearest legal one.
+    """
+    betting = new_round(2)
+    assert betting.legal_action(" CALL ") == ("hold", 0)
+    assert betting.legal_action("raise", 0) == ("hold", 0)
+    assert betting.legal_action("raise", -5) == ("hold", 0)
+    assert betting.legal_action("raise", "15") == ("raise", 15)
+    assert betting.legal_action("fold", 30) == ("fold", 0)
+    betting.act("raise", 10)
+    assert betting.legal_action("hold") == ("call", 0)
+    with pytest.raises(ValueError):
+        betting.legal_action("bet")
+
+
+def test_pickled_round_resumes():
+    """
+    A round put aside mid phase as a pickle carries on as the original.
+    """
+    betting = new_round(3, first_player=2)
+    betting.act("raise", 10)
+    betting.act("call")
+    resumed = pickle.loads(pickle.dumps(betting))
+    for round_ in (betting, resumed):
+        assert round_.player == 1
+        round_.act("raise", 5)
+        round_.act("call")
+        round_.act("fold")
+    assert resumed.done and betting.done
+    assert resumed.bids == betting.bids == [60, 65, 65]
+    assert resumed.statuses == betting.statuses
@@ -0,0 +1,113 @@
+import random
+
+import pytest
+
+from deck import JOKER, Card, Deck, encode
+
+""" Deck Tests.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+SEQUENCES = 3000  # Random runs of shuffles, cuts, deals and burns
+
+
+class ListDeck:
+    """
+    Class dealing from a plain list, as the deck did before it was held
+    in a fixed list with an offset
+    """
+
+    def __init__(self, add_jokers, rng):
+        """
+        Constructor for the ListDeck class.
+
+        :param add_jokers: whether or not to add jokers to the deck
+        :param rng: the random number generator to shuffle with
+        """
+        self.rng = rng
+        self.cards = [encode(symbol, value) for symbol in range(4)
+                      for value in range(2, 15)]
+        if add_jokers:
+            self.cards += [JOKER, JOKER + 1]
+        self.inplay = []
+
+    def shuffle(self):
+        """
+        Gathers the dealt cards under the rest, then shuffles.
+        """
+        self.cards.extend(self.inplay)
+        self.inplay = []
+        self.rng.shuffle(self.cards)
+
+    def cut(self, amount):
+        """
+        Moves cards from the top of the deck to the bottom.
+
+        :param amount: the number of cards to move
+        :return: true if the deck was cut and false otherwise
+        """
+        if not amount or amount < 0 or amount >= len(self.cards):
+            return False
+        self.cards = self.cards[amount:] + self.cards[:amount]
+        return True
+
+    def deal(self, number_of_cards):
+        """
+        Deals cards from the top of the deck.
+
+        :param number_of_cards: the number of cards to deal
+        :return: the cards dealt, or false if there aren't enough
+        """
+        if number_of_cards > len(self.cards):
+            return False
+        dealt = self.cards[:number_of_cards]
+        self.cards = self.cards[number_of_cards:]
+        self.inplay.extend(dealt)
+        return dealt
+
+
+@pytest.mark.parametrize("add_jokers", [False, True])
+def test_matches_list_deck(add_jokers):
+    """
+    Seeded runs of shuffles, cuts, deals and burns leave the deck exactly
+    as a plain list deck, including cuts that wrap around the end.
+    """
+    for sequence in range(SEQUENCES):
+        deck = Deck(add_jokers, random.Random(sequence))
+        reference = ListDeck(add_jokers, random.Random(sequence))
+        steps = random.Random(-1 - sequence)
+        for step in range(steps.randint(1, 30)):
+            operation = steps.choice(("shuffle", "cut", "deal", "burn"))
+            if operation == "shuffle":
+                deck.shuffle()
+                reference.shuffle()
+            elif operation == "cut":
+                amount = steps.randint(-2, deck.total_cards + 1)
+                assert deck.cut(amount) == reference.cut(amount)
+            elif operation == "deal":
+                amount = steps.randint(0, 12)
+                assert deck.deal(amount) == reference.deal(amount)
+            else:
+                amount = steps.randint(0, 5)
+                burned = reference.deal(amount) is not False
+                assert deck.burn(amount) == burned
+            assert deck.cards == reference.cards
+            assert deck.inplay == reference.inplay
+            assert deck.cards_left() == len(reference.cards)
+
+
+def test_cards_are_shared_and_checked():
+    """
+    Building a card gives the shared one, and no card is made for a
+    symbol or value that doesn't exist.
+    """
+    assert Card(2, 14) is Card(2, 14)
+    assert str(Card(2, 14)) == "AS"
+    for symbol, value in ((99, 7), (0, 99), (1, 1)):
+        with pytest.raises(ValueError):
+            Card(symbol, value)
@@ -0,0 +1,94 @@
+import random
+
+import pytest
+
+import evaluator
+from evaluator import HandState, evaluate, score_batch
+from holdem import Poker
+
+""" Hand Evaluator Tests.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+HANDS = 20000  # Random hands checked of each size
+
+# Hands the random ones rarely deal, by card code (value - 2) * 4 + symbol
+SPECIAL_HANDS = [
+    [49, 0, 4, 8, 12],  # Ace low straight
+    [49, 0, 4, 8, 13, 17, 26],  # Ace low straight under a six high one
+    [49, 1, 5, 9, 13],  # Ace low straight flush
+    [32, 36, 40, 44, 48],  # Royal flush
+    [32, 36, 40, 44, 48, 1, 2],  # Royal flush over a pair
+    [0, 1, 2, 3, 4, 5, 6],  # Four of a kind over three of a kind
+    [0, 1, 2, 4, 5, 6, 8],  # Two threes of a kind
+    [0, 1, 4, 5, 8, 9, 12],  # Three pairs
+    [0, 4, 8, 12, 20, 24, 28],  # Flush holding no straight flush
+]
+
+
+def random_hands(size, seed):
+    """
+    Deals random hands of one size.
+
+    :param size: the number of cards in each hand
+    :param seed: the seed of the random number generator
+    :return: a list of hands, which are lists of card codes
+    """
+    rng = random.Random(seed)
+    return [rng.sample(range(52), size) for i in range(HANDS)]
+
+
+@pytest.mark.parametrize("size", [2, 5, 6, 7])
+def test_categories_match_legacy(size):
+    """
+    Every hand is put in the same category as Poker.legacy_score puts it.
+    """
+    for hand in random_hands(size, size) + [hand for hand in SPECIAL_HANDS
+                                            if len(hand) == size]:
+        legacy = Poker.legacy_score(sorted(hand))[0]
+        assert evaluator.score(hand)[0] == legacy, hand
+
+
+def test_every_two_card_hand_matches_legacy():
+    """
+    Every one of the 1326 starting hands is put in the same category.
+    """
+    for first in range(52):
+        for second in range(first + 1, 52):
+            hand = [first, second]
+            assert evaluator.score(hand)[0] == Poker.legacy_score(hand)[0]
+
+
+@pytest.mark.parametrize("size", [2, 5, 6, 7])
+def test_hand_state_matches_evaluate(size):
+    """
+    A HandState built a card at a time, and copies of it, rank every
+    street the same as evaluate.
+    """
+    for hand in random_hands(size, 100 + size)[:5000] + SPECIAL_HANDS:
+        hand = hand[:size]
+        state = HandState()
+        for count, card in enumerate(hand, 1):
+            state.add(card)
+            assert state.rank() == evaluate(hand[:count]), hand[:count]
+        assert state.copy().rank() == evaluate(hand)
+        assert HandState(hand).score() == evaluator.score(hand)
+
+
+@pytest.mark.skipif(evaluator.numpy is None,
+                    reason="numpy is not installed")
+@pytest.mark.parametrize("size", [5, 6, 7])
+def test_score_batch_matches_evaluate(size):
+    """
+    Scoring a batch gives every hand the rank evaluate gives it.
+    """
+    hands = random_hands(size, 200 + size) + [hand for hand in SPECIAL_HANDS
+                                              if len(hand) == size]
+    categories, ranks = score_batch(hands)
+    assert ranks.tolist() == [evaluate(hand) for hand in hands]
+    assert categories.tolist() == [evaluate(hand) >> 20 for hand in hands]
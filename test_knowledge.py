@@ -0,0 +1,132 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import knowledge
+from knowledge import KnowledgeBase, KnowledgeProvider, OutcomeLog, \
+    SharedKnowledge, compile_snapshot, load_knowledge, parse_knowledge, \
+    read_knowledge
+
+""" Knowledge Tests.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+ATTACH = ("import sys\n"
+          "from knowledge import load_knowledge\n"
+          "print(load_knowledge('shm:' + sys.argv[1]).odds((0, 1, 1, 1, 0)))")
+
+
+def test_attachers_one_after_another():
+    """
+    Each process attaching to shared knowledge may exit without freeing
+    it for the ones after it.
+    """
+    knowledge_base = KnowledgeBase()
+    knowledge_base.add("0, 1, 1, 1, 0", "0.6000", 6, 10)
+    shared = SharedKnowledge(knowledge_base)
+    try:
+        for attacher in range(2):
+            done = subprocess.run([sys.executable, "-c", ATTACH, shared.name],
+                                  capture_output=True, text=True)
+            assert done.returncode == 0, done.stderr
+            assert float(done.stdout) == 0.6
+            assert "leaked" not in done.stderr
+    finally:
+        shared.close()
+
+
+def test_compaction_stopped_after_merge(tmp_path, monkeypatch):
+    """
+    A compaction stopped between merging the log and removing it doesn't
+    count the log again when the next compaction finishes it.
+    """
+    knowledge_path = str(tmp_path / "knowledge.txt")
+    log_path = str(tmp_path / "outcomes.csv")
+    log = OutcomeLog(log_path)
+    log.write([0, 1, 1, 1], 0, 1)
+    log.write([0, 1, 1, 1], 0, 0)
+
+    def stop(path):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(knowledge.os, "remove", stop)
+    with pytest.raises(KeyboardInterrupt):
+        log.compact(knowledge_path)
+    monkeypatch.undo()
+
+    log = OutcomeLog(log_path)
+    log.write([0, 1, 1, 1], 0, 1)
+    log.compact(knowledge_path)
+    log.close()
+    counts, percentages = read_knowledge(knowledge_path)
+    assert counts == {"0, 1, 1, 1, 0": [2, 3]}
+    assert not os.path.exists(log_path + ".compacting")
+
+
+def test_compaction_into_snapshot(tmp_path):
+    """
+    Compacting into a snapshot merges into the text file it was compiled
+    from, then compiles it again. Shared knowledge is refused before the
+    log is touched.
+    """
+    knowledge_path = str(tmp_path / "knowledge.txt")
+    compiled_path = str(tmp_path / "knowledge.knb")
+    with open(knowledge_path, "w") as file:
+        file.write("0, 1, 1, 1, 0 | 0.5000 | 1 | 2\n")
+    with open(knowledge_path) as file:
+        compile_snapshot(parse_knowledge(file.read()), compiled_path)
+
+    log_path = str(tmp_path / "outcomes.csv")
+    log = OutcomeLog(log_path)
+    log.write([0, 1, 1, 1], 0, 1)
+    log.compact(compiled_path)
+
+    counts, percentages = read_knowledge(knowledge_path)
+    assert counts == {"0, 1, 1, 1, 0": [2, 3]}
+    assert load_knowledge(compiled_path).odds((0, 1, 1, 1, 0)) == 2 / 3
+    assert not os.path.exists(log_path + ".compacting")
+
+    log.write([0, 1, 1, 1], 0, 1)
+    with pytest.raises(ValueError):
+        log.compact("shm:knowledge")
+    log.close()
+    assert not os.path.exists(log_path + ".compacting")
+    assert not os.path.exists("shm:knowledge")
+    with open(log_path) as file:
+        assert len(file.readlines()) == 2
+
+
+def test_corrupt_snapshot(tmp_path):
+    """
+    A corrupt snapshot raises ValueError instead of exiting, and a provider
+    reloading it keeps the knowledge it had.
+    """
+    path = str(tmp_path / "knowledge.knb")
+    knowledge_base = KnowledgeBase()
+    knowledge_base.add("0, 1, 1, 1, 0", "0.6000", 6, 10)
+    compile_snapshot(knowledge_base, path)
+    provider = KnowledgeProvider(path, interval=3600)
+    try:
+        with open(path, "r+b") as file:
+            file.write(b"XXXX")
+        with pytest.raises(ValueError):
+            load_knowledge(path)
+        assert not provider.reload()
+        knowledge, generation = provider.current()
+        assert generation == 1
+        assert knowledge.odds((0, 1, 1, 1, 0)) == 0.6
+
+    finally:
+        provider.stop()
+
+    short_path = str(tmp_path / "short.knb")
+    with open(short_path, "wb") as file:
+        file.write(b"KNWB")
+    with pytest.raises(ValueError):
+        load_knowledge(short_path)
@@ -0,0 +1,87 @@
+import pytest
+
+from holdem import Poker
+from policy import PHASES, compile_policy, numpy
+
+""" Compiled Policy Tests.
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+RATIO_SETS = [None,
+              ((0, 1.5, 1.5), (62, 0.45, 0.3), (93, 1.65, 1.05),
+               (81, 1.9, 1.7)),
+              ((0, 0.2, 0.2), (95, 2.0, 0.2), (60, 0.2, 0.2), (70, 1.0, 0.6))]
+
+
+def cases(policy):
+    """
+    Gets every case the table holds, and rises past its width.
+
+    :param policy: the Policy to cover
+    :return: a list of (phase, odds, highest bid, previous highest, bid)
+    """
+    found = []
+    for phase in range(PHASES):
+        for odds in range(101):
+            for rise in list(range(policy.width)) + [policy.width,
+                                                     policy.width + 7,
+                                                     policy.width * 3]:
+                highest_bid = 60 + rise
+                for bid in (highest_bid, highest_bid - 1, 60):
+                    found.append((phase, odds, highest_bid, 60, bid))
+    return found
+
+
+def tree_decision(ratios, phase, odds, highest_bid, prev_round_highest, bid):
+    """
+    Gets the decision of the decision tree itself, as the policy gives it.
+
+    :param ratios: the ratios of each phase, Poker.PHASE_RATIOS by default
+    :param phase: which phase the game is in
+    :param odds: the odds of winning, 0 through 100
+    :param highest_bid: the highest bid currently out
+    :param prev_round_highest: the highest bid when the phase started
+    :param bid: the most the AI has bid
+    :return: the action, and the amount to raise by, 0 if not a raise
+    """
+    upper_bound = Poker.upper_bound(odds, phase, ratios)
+    decision = Poker.decision_tree(highest_bid, prev_round_highest, bid,
+                                   upper_bound, phase)
+    if decision[0] != "raise":
+        return decision[0], 0
+    return decision[0], decision[1]
+
+
+@pytest.mark.parametrize("ratios", RATIO_SETS)
+def test_decide_matches_tree(ratios):
+    """
+    Every case looked up matches the decision tree.
+    """
+    policy = compile_policy(ratios)
+    for case in cases(policy):
+        assert policy.decide(*case) == tree_decision(ratios, *case), case
+
+
+@pytest.mark.skipif(numpy is None, reason="numpy is not installed")
+@pytest.mark.parametrize("ratios", RATIO_SETS)
+def test_decide_batch_matches_tree(ratios):
+    """
+    Every case looked up in one batch matches the decision tree.
+    """
+    policy = compile_policy(ratios)
+    found = cases(policy)
+    decisions = policy.decide_batch(*zip(*found))
+    assert decisions == [tree_decision(ratios, *case) for case in found]
+
+
+def test_compiled_once_per_ratios():
+    """
+    Each set of ratios is only compiled once.
+    """
+    assert compile_policy() is compile_policy(Poker.PHASE_RATIOS)
+    assert compile_policy(RATIO_SETS[1]) is not compile_policy()
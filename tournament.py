@@ -0,0 +1,288 @@
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from math import sqrt
+
+from betting import ACTIONS
+from engine import DecisionTreeAgent, GameEngine, RandomAgent, ScriptedAgent
+from equity import Z_95
+from holdem import Poker
+from knowledge import load_knowledge
+from shards import shard_seeds, split_counts
+
+""" Texas Hold Em AI Tournament.
+
+This module plays bots against each other to measure how well they do.
+
+The hands are split into matches played across a pool of processes. Each
+match is a fresh table with the dealer rotating every hand, seeded from the
+master seed, so a tournament is reproducible for a given seed and number of
+matches, however many workers play it.
+
+A player is given as one of:
+
+    tree        the AI's decision tree, with the phase ratios of --ratios
+    random      random legal actions
+    call        checks or calls every bid
+
+Usage:
+    python tournament.py [--players P P...] [--hands N] [--matches N]
+                         [--seed N] [--workers N] [--knowledge FILE]
+                         [--ratios T:S:R,T:S:R,T:S:R,T:S:R]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+PLAYERS = ("tree", "random", "call")
+PHASES = 4
+
+# The knowledge loaded by each process, keyed by path
+loaded_knowledge = {}
+
+
+def make_agent(player, knowledge_path, ratios, seed):
+    """
+    Builds the agent of a player.
+
+    :param player: which of PLAYERS the agent plays like
+    :param knowledge_path: the knowledge the tree looks its odds up in
+    :param ratios: the phase ratios of the tree, see Poker.PHASE_RATIOS
+    :param seed: the seed of the agent's random number generator
+    :return: the agent
+    """
+    if player == "tree":
+        if knowledge_path not in loaded_knowledge:
+            loaded_knowledge[knowledge_path] = load_knowledge(knowledge_path)
+        return DecisionTreeAgent(loaded_knowledge[knowledge_path],
+                                 ratios=ratios)
+    if player == "random":
+        return RandomAgent(random.Random(seed))
+    if player == "call":
+        return ScriptedAgent([])
+    sys.exit("*** ERROR ***: Unknown player " + player + ".")
+
+
+class MatchStats:
+    """
+    Class counting the chips and actions of each player over a match
+    """
+
+    def __init__(self, number_of_players):
+        """
+        Constructor for the MatchStats class.
+
+        :param number_of_players: the number of players at the table
+        """
+        self.hands = 0
+        self.seconds = 0.0
+        self.chips = [0] * number_of_players
+        # Sums of squares, for the variance of the chips won each hand
+        self.squares = [0] * number_of_players
+        # The count of each action, by player then phase
+        self.actions = [[dict.fromkeys(ACTIONS, 0) for phase in range(PHASES)]
+                        for player in range(number_of_players)]
+
+    def __call__(self, event, data):
+        """
+        Counts an event of a hand, as an observer of the GameEngine.
+
+        :param event: the name of the event
+        :param data: a dictionary of the event's data
+        """
+        if event == "action":
+            self.actions[data["player"]][data["phase"]][data["action"]] += 1
+        elif event == "result":
+            self.hands += 1
+            for player, chips in enumerate(data["chips"]):
+                self.chips[player] += chips
+                self.squares[player] += chips * chips
+
+    def merge(self, other):
+        """
+        Adds the counts of another match.
+
+        :param other: the MatchStats to add
+        """
+        self.hands += other.hands
+        self.seconds += other.seconds
+        for player in range(len(self.chips)):
+            self.chips[player] += other.chips[player]
+            self.squares[player] += other.squares[player]
+            for phase in range(PHASES):
+                for action in ACTIONS:
+                    self.actions[player][phase][action] += \
+                        other.actions[player][phase][action]
+
+    def chips_per_100(self, player):
+        """
+        Gets the chips a player won per 100 hands.
+
+        :param player: the id of the player
+        :return: the chips won per 100 hands, and the half width of
+                 its 95% confidence interval
+        """
+        mean = self.chips[player] / self.hands
+        variance = self.squares[player] / self.hands - mean * mean
+        error = sqrt(max(variance, 0) / self.hands)
+        return mean * 100, Z_95 * error * 100
+
+
+def play_match(players, hands, seed, knowledge_path, ratios=None):
+    """
+    Plays a match of hands at one table.
+
+    :param players: which of PLAYERS each seat is played by
+    :param hands: the number of hands to play
+    :param seed: the seed of the match
+    :param knowledge_path: the knowledge the trees look their odds up in
+    :param ratios: the phase ratios of the trees, see Poker.PHASE_RATIOS
+    :return: the MatchStats of the match
+    """
+    rng = random.Random(seed)
+    agents = [make_agent(player, knowledge_path, ratios, rng.getrandbits(64))
+              for player in players]
+    stats = MatchStats(len(players))
+    game = GameEngine(agents, Poker(len(players), rng=rng), rng,
+                      observers=[stats])
+    start = time.perf_counter()
+    for i in range(hands):
+        game.play_hand()
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+def run_tournament(players, hands, master_seed=None, matches=None,
+                   workers=None, knowledge_path="knowledge.txt",
+                   ratios=None):
+    """
+    Splits the hands into matches played across a pool of processes.
+
+    :param players: which of PLAYERS each seat is played by
+    :param hands: the number of hands to play
+    :param master_seed: the seed each match's seed is derived from
+    :param matches: the number of matches, one per worker by default
+    :param workers: the number of processes, all cores by default
+    :param knowledge_path: the knowledge the trees look their odds up in
+    :param ratios: the phase ratios of the trees, see Poker.PHASE_RATIOS
+    :return: the MatchStats of every match added together, and the
+             seconds the tournament took
+    """
+    matches = matches or workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(workers) as pool:
+        counts = split_counts(hands, matches)
+        seeds = shard_seeds(master_seed, matches)
+
+        start = time.perf_counter()
+        stats = MatchStats(len(players))
+        for match in pool.map(play_match, [players] * matches, counts, seeds,
+                              [knowledge_path] * matches,
+                              [ratios] * matches):
+            stats.merge(match)
+    return stats, time.perf_counter() - start
+
+
+def report(players, stats, seconds):
+    """
+    Prints the results of a tournament.
+
+    :param players: which of PLAYERS each seat was played by
+    :param stats: the MatchStats of the tournament
+    :param seconds: the seconds the tournament took
+    """
+    print("{:,} hands in {:.1f}s, {:,.0f} hands/s".format(
+        stats.hands, seconds, stats.hands / seconds if seconds else 0.0))
+    for player in range(len(players)):
+        rate, width = stats.chips_per_100(player)
+        print("Player {} ({}): {:+.1f} +/- {:.1f} chips per 100 hands".format(
+            player, players[player], rate, width))
+        for phase in range(PHASES):
+            counts = stats.actions[player][phase]
+            total = sum(counts.values())
+            text = "    Phase " + str(phase) + ":"
+            for action in ACTIONS:
+                share = counts[action] / total if total else 0.0
+                text += "  {} {:.1%}".format(action, share)
+            print(text)
+
+
+def parse_ratios(text):
+    """
+    Reads phase ratios from the command line.
+
+    :param text: each phase's threshold:strong ratio:ratio, comma separated
+    :return: the ratios, laid out as Poker.PHASE_RATIOS
+    """
+    try:
+        ratios = tuple(tuple(float(number) for number in phase.split(":"))
+                       for phase in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError("ratios must be numbers")
+    if len(ratios) != PHASES or any(len(phase) != 3 for phase in ratios):
+        raise argparse.ArgumentTypeError(
+            "give threshold:strong ratio:ratio for each of the 4 phases")
+    return ratios
+
+
+def parse_arguments(arguments):
+    """
+    Reads the command line options of a tournament.
+
+    :param arguments: the command line arguments, without the program name
+    :return: the parsed options
+    """
+    parser = argparse.ArgumentParser(
+        description="Plays bots against each other to measure them.")
+    parser.add_argument("--players", nargs="+", choices=PLAYERS,
+                        default=["tree", "random"],
+                        help="who plays each seat (default tree random)")
+    parser.add_argument("--hands", type=int, default=100000,
+                        help="number of hands to play (default 100000)")
+    parser.add_argument("--matches", type=int, default=None,
+                        help="matches to split the hands into "
+                             "(default one per worker)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed making the tournament reproducible")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes to play on (default all cores)")
+    parser.add_argument("--knowledge", default="knowledge.txt",
+                        help="knowledge the trees play with "
+                             "(default knowledge.txt)")
+    parser.add_argument("--ratios", type=parse_ratios, default=None,
+                        help="phase ratios of the trees, as "
+                             "threshold:strong ratio:ratio for each phase")
+    options = parser.parse_args(arguments)
+
+    if len(options.players) < 2 or len(options.players) > 10:
+        parser.error("the number of players must be between 2 and 10")
+    if options.hands < 1:
+        parser.error("the number of hands must be at least 1")
+    if options.matches is not None and options.matches < 1:
+        parser.error("the number of matches must be at least 1")
+    if options.workers is not None and options.workers < 1:
+        parser.error("the number of workers must be at least 1")
+    return options
+
+
+def main(arguments):
+    """
+    Runs a tournament from the command line.
+
+    :param arguments: the command line arguments, without the program name
+    """
+    options = parse_arguments(arguments)
+    stats, seconds = run_tournament(options.players, options.hands,
+                                    options.seed, options.matches,
+                                    options.workers, options.knowledge,
+                                    options.ratios)
+    report(options.players, stats, seconds)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,324 @@
+import argparse
+import csv
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from engine import GameEngine, RandomAgent
+from holdem import Poker
+from shards import shard_seeds, split_counts
+from tournament import PHASES, PLAYERS, MatchStats, make_agent, parse_ratios
+
+""" AI Phase Ratio Tuner.
+
+This module searches for the phase ratios the AI plays best with, see
+Poker.PHASE_RATIOS, by successive halving. Random sets of ratios, and the
+current ones, each play a round of hands as seat 0 against the opponents,
+across a pool of processes. The best third go on to the next round, with
+three times the hands, until one is left. Losing candidates stop after a
+few thousand hands, and the hands are spent on the ones worth telling apart.
+
+Every candidate of a round plays the same deals: each match is seeded the
+same, every hand deals the whole board whatever is bid, and the random
+opponents are reseeded every hand. The difference between two candidates is
+then down to how they bid, not the cards they were dealt.
+
+The leaderboard is saved after every round, best first, with each
+candidate's ratios written as --ratios takes them.
+
+Usage:
+    python tune.py [--candidates N] [--hands N] [--eta N]
+                   [--opponents P P...] [--seed N] [--matches N]
+                   [--workers N] [--knowledge FILE] [--leaderboard FILE]
+
+Authors:
+    Charles Billingsley
+    Josh Getter
+    Adam Stewart
+    Josh Techentin
+"""
+
+THRESHOLDS = (60, 95)  # The range thresholds are picked from
+RATIOS = (0.2, 2.0)  # The range ratios are picked from
+STEP = 0.05  # What ratios are rounded to
+
+
+def format_ratios(ratios):
+    """
+    Writes phase ratios the way --ratios reads them.
+
+    :param ratios: the ratios, laid out as Poker.PHASE_RATIOS
+    :return: each phase's threshold:strong ratio:ratio, comma separated
+    """
+    return ",".join(":".join("{:g}".format(number) for number in phase)
+                    for phase in ratios)
+
+
+def sample_ratios(rng):
+    """
+    Picks random phase ratios. A phase's strong ratio is never below its
+    ratio, and the first phase has no threshold, as in Poker.PHASE_RATIOS.
+
+    :param rng: the random number generator to pick with
+    :return: the ratios, laid out as Poker.PHASE_RATIOS
+    """
+    steps = int(round((RATIOS[1] - RATIOS[0]) / STEP))
+    ratios = []
+    for phase in range(PHASES):
+        pair = sorted(round(RATIOS[0] + rng.randint(0, steps) * STEP, 2)
+                      for i in range(2))
+        if phase == 0:
+            ratios.append((0, pair[1], pair[1]))
+        else:
+            ratios.append((rng.randint(*THRESHOLDS), pair[1], pair[0]))
+    return tuple(ratios)
+
+
+def play_candidate(ratios, opponents, hands, seed, knowledge_path):
+    """
+    Plays a match of hands with a candidate's ratios in seat 0.
+
+    :param ratios: the phase ratios of the candidate
+    :param opponents: which of PLAYERS each other seat is played by, with
+                      trees playing the current ratios
+    :param hands: the number of hands to play
+    :param seed: the seed of the match, the same for every candidate
+    :param knowledge_path: the knowledge the trees look their odds up in
+    :return: the MatchStats of the match
+    """
+    rng = random.Random(seed)
+    agents = [make_agent("tree", knowledge_path, ratios, rng.getrandbits(64))]
+    agents += [make_agent(player, knowledge_path, None, rng.getrandbits(64))
+               for player in opponents]
+    stats = MatchStats(len(agents))
+    game = GameEngine(agents, Poker(len(agents), rng=rng), rng,
+                      observers=[stats])
+    start = time.perf_counter()
+    for i in range(hands):
+        # So they act the same on each deal, however the candidate bid
+        # on the ones before it
+        for seat, agent in enumerate(agents):
+            if isinstance(agent, RandomAgent):
+                agent.rng.seed("{}:{}:{}".format(seed, i, seat))
+        game.play_hand()
+    stats.seconds = time.perf_counter() - start
+    return stats
+
+
+class Candidate:
+    """
+    Class holding a set of phase ratios and how it has played so far
+    """
+
+    def __init__(self, ratios, number_of_players):
+        """
+        Constructor for the Candidate class.
+
+        :param ratios: the phase ratios, laid out as Poker.PHASE_RATIOS
+        :param number_of_players: the number of players at the table
+        """
+        self.ratios = ratios
+        self.stats = MatchStats(number_of_players)
+        self.rounds = 0
+
+    def score(self):
+        """
+        Gets the chips the candidate won per 100 hands.
+
+        :return: the chips won per 100 hands, and the half width of its
+                 95% confidence interval
+        """
+        if not self.stats.hands:
+            return 0.0, 0.0
+        return self.stats.chips_per_100(0)
+
+    def rank(self):
+        """
+        Gets what the candidate is sorted by, the rounds it lasted and
+        then its score.
+
+        :return: a tuple sorting the best candidate first
+        """
+        return -self.rounds, -self.score()[0]
+
+
+def write_leaderboard(path, candidates):
+    """
+    Saves the candidates, best first.
+
+    :param path: the CSV file to write
+    :param candidates: the Candidates of the search
+    """
+    with open(path, "w", newline="") as leaderboard:
+        writer = csv.writer(leaderboard)
+        writer.writerow(["rank", "ratios", "chips_per_100", "ci_95",
+                         "hands", "rounds"])
+        for place, candidate in enumerate(sorted(candidates,
+                                                 key=Candidate.rank)):
+            rate, width = candidate.score()
+            writer.writerow([place + 1, format_ratios(candidate.ratios),
+                             "{:.1f}".format(rate), "{:.1f}".format(width),
+                             candidate.stats.hands, candidate.rounds])
+
+
+def search(candidates, opponents, hands, eta=3, master_seed=None,
+           matches=None, workers=None, knowledge_path="knowledge.txt",
+           leaderboard_path=None):
+    """
+    Narrows the candidates down to one by successive halving.
+
+    :param candidates: the phase ratios of each candidate
+    :param opponents: which of PLAYERS each other seat is played by
+    :param hands: the hands each candidate plays in the first round
+    :param eta: how many times fewer candidates, and more hands, each
+                round has
+    :param master_seed: the seed each round's deals are derived from
+    :param matches: the matches each candidate's hands are split into,
+                    one per worker by default
+    :param workers: the number of processes, all cores by default
+    :param knowledge_path: the knowledge the trees look their odds up in
+    :param leaderboard_path: the CSV file saved after every round, or None
+    :return: the Candidates, best first
+    """
+    number_of_players = len(opponents) + 1
+    everyone = [Candidate(ratios, number_of_players) for ratios in candidates]
+    alive = list(everyone)
+    matches = matches or workers or os.cpu_count() or 1
+    rng = random.Random(master_seed)
+
+    with ProcessPoolExecutor(workers) as pool:
+        round_number = 0
+        while True:
+            round_number += 1
+            counts = split_counts(hands, matches)
+            # Every candidate plays the same deals
+            seeds = shard_seeds(rng.getrandbits(64), matches)
+            jobs = [(candidate, match) for candidate in alive
+                    for match in range(matches)]
+
+            start = time.perf_counter()
+            played = pool.map(play_candidate,
+                              [candidate.ratios for candidate, match in jobs],
+                              [opponents] * len(jobs),
+                              [counts[match] for candidate, match in jobs],
+                              [seeds[match] for candidate, match in jobs],
+                              [knowledge_path] * len(jobs))
+            for (candidate, match), stats in zip(jobs, played):
+                candidate.stats.merge(stats)
+            seconds = time.perf_counter() - start
+            for candidate in alive:
+                candidate.rounds = round_number
+
+            alive.sort(key=Candidate.rank)
+            if leaderboard_path:
+                write_leaderboard(leaderboard_path, everyone)
+            best, width = alive[0].score()
+            print("Round {}: {} candidates, {:,} hands each in {:.1f}s, "
+                  "best {:+.1f} +/- {:.1f} ({})".format(
+                      round_number, len(alive), hands, seconds, best, width,
+                      format_ratios(alive[0].ratios)))
+
+            # The losers are stopped here
+            keep = max(1, len(alive) // eta)
+            alive = alive[:keep]
+            if keep == 1:
+                break
+            hands *= eta
+    return sorted(everyone, key=Candidate.rank)
+
+
+def parse_arguments(arguments):
+    """
+    Reads the command line options of the tuner.
+
+    :param arguments: the command line arguments, without the program name
+    :return: the parsed options
+    """
+    parser = argparse.ArgumentParser(
+        description="Searches for the phase ratios the AI plays best with.")
+    parser.add_argument("--candidates", type=int, default=27,
+                        help="sets of ratios to try, the current ones "
+                             "among them (default 27)")
+    parser.add_argument("--hands", type=int, default=2000,
+                        help="hands each candidate plays in the first "
+                             "round (default 2000)")
+    parser.add_argument("--eta", type=int, default=3,
+                        help="how many times fewer candidates, and more "
+                             "hands, each round has (default 3)")
+    parser.add_argument("--opponents", nargs="+", choices=PLAYERS,
+                        default=["tree", "random"],
+                        help="who plays the other seats, trees with the "
+                             "current ratios (default tree random)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed making the search reproducible")
+    parser.add_argument("--matches", type=int, default=None,
+                        help="matches to split each candidate's hands into "
+                             "(default one per worker)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="processes to play on (default all cores)")
+    parser.add_argument("--knowledge", default="knowledge.txt",
+                        help="knowledge the trees play with "
+                             "(default knowledge.txt)")
+    parser.add_argument("--baseline", type=parse_ratios, default=None,
+                        help="ratios to start from, as threshold:strong "
+                             "ratio:ratio for each phase (default the "
+                             "current ones)")
+    parser.add_argument("--leaderboard", default="leaderboard.csv",
+                        help="CSV file to save the candidates to "
+                             "(default leaderboard.csv)")
+    options = parser.parse_args(arguments)
+
+    if options.candidates < 1:
+        parser.error("the number of candidates must be at least 1")
+    if options.hands < 1:
+        parser.error("the number of hands must be at least 1")
+    if options.eta < 2:
+        parser.error("eta must be at least 2")
+    if len(options.opponents) > 9:
+        parser.error("the number of opponents must be between 1 and 9")
+    if options.matches is not None and options.matches < 1:
+        parser.error("the number of matches must be at least 1")
+    if options.workers is not None and options.workers < 1:
+        parser.error("the number of workers must be at least 1")
+    return options
+
+
+def main(arguments):
+    """
+    Runs the tuner from the command line.
+
+    :param arguments: the command line arguments, without the program name
+    """
+    options = parse_arguments(arguments)
+    seed = options.seed
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+        print("Seed " + str(seed) + ".")
+    rng = random.Random(seed)
+    baseline = tuple(tuple(phase) for phase in
+                     (options.baseline or Poker.PHASE_RATIOS))
+    candidates = [baseline]
+    while len(candidates) < options.candidates:
+        ratios = sample_ratios(rng)
+        if ratios not in candidates:
+            candidates.append(ratios)
+
+    start = time.perf_counter()
+    ranked = search(candidates, options.opponents, options.hands,
+                    options.eta, rng.getrandbits(64), options.matches,
+                    options.workers, options.knowledge, options.leaderboard)
+    print("Searched in {:.1f}s, leaderboard saved to {}.".format(
+        time.perf_counter() - start, options.leaderboard))
+    for place, candidate in enumerate(ranked[:5]):
+        rate, width = candidate.score()
+        print("{}. {:+.1f} +/- {:.1f} chips per 100 hands over {:,} hands"
+              "{}:  --ratios {}".format(
+                  place + 1, rate, width, candidate.stats.hands,
+                  " (current)" if candidate.ratios == baseline else "",
+                  format_ratios(candidate.ratios)))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])